@@ -0,0 +1,201 @@
+"""
+Asyncio front end for S3Manager.
+
+boto3 is blocking, so every call runs on a dedicated thread pool and is awaited from the
+event loop. A semaphore caps how many calls are queued or running at once, so code that
+reads a websocket can overlap S3 I/O with its own work without flooding the pool.
+
+    async with AsyncS3Manager(max_concurrency=16) as s3:
+        await asyncio.gather(*(s3.upload_file(path, 'my-bucket') for path in paths))
+        async for obj in s3.iter_objects('my-bucket', prefix='data/'):
+            ...
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from main import MAX_POOL_CONNECTIONS, S3Manager
+
+
+class AsyncS3Manager:
+    def __init__(self, region=None, profile_name=None, max_concurrency=16, endpoint_url=None):
+        """
+        Initialize the AsyncS3Manager with optional region and AWS profile.
+
+        :param region: AWS region, e.g., 'us-west-2'. If None, default region is used.
+        :param profile_name: AWS profile name from the credentials file. If None, default profile is used.
+        :param max_concurrency: Maximum number of S3 operations running at the same time
+        :param endpoint_url: Custom S3 endpoint, e.g. a local MinIO or moto server
+        """
+        self.manager = S3Manager(region=region, profile_name=profile_name, endpoint_url=endpoint_url,
+                                 max_pool_connections=max(MAX_POOL_CONNECTIONS, max_concurrency))
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='async-s3')
+        self._limit = asyncio.Semaphore(max_concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """
+        Wait for running operations to finish, release the thread pool and close the manager.
+        """
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+        self.manager.close()
+
+    async def _run(self, fn, *args, **kwargs):
+        async with self._limit:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, partial(fn, *args, **kwargs))
+
+    async def create_bucket(self, bucket_name, region=None):
+        """Create an S3 bucket. See S3Manager.create_bucket."""
+        return await self._run(self.manager.create_bucket, bucket_name, region=region)
+
+    async def list_buckets(self):
+        """List all S3 buckets in the account. See S3Manager.list_buckets."""
+        return await self._run(self.manager.list_buckets)
+
+    async def delete_bucket(self, bucket_name, max_workers=8):
+        """Delete an S3 bucket with all its objects. See S3Manager.delete_bucket."""
+        return await self._run(self.manager.delete_bucket, bucket_name, max_workers=max_workers)
+
+    async def upload_file(self, file_path, bucket_name, object_name=None, config=None, callback=None):
+        """Upload a file to an S3 bucket. See S3Manager.upload_file."""
+        return await self._run(self.manager.upload_file, file_path, bucket_name, object_name,
+                               config=config, callback=callback)
+
+    async def upload_stream(self, source, bucket_name, object_name, part_size=None, max_workers=4, extra_args=None):
+        """
+        Upload bytes, a file-like object or an async or sync iterator of chunks.
+
+        Async iterators are drained into the blocking uploader one chunk at a time through a
+        small bounded queue, so memory stays bounded as in S3Manager.upload_stream.
+        """
+        kwargs = {'max_workers': max_workers, 'extra_args': extra_args}
+        if part_size:
+            kwargs['part_size'] = part_size
+        if not hasattr(source, '__aiter__'):
+            return await self._run(self.manager.upload_stream, source, bucket_name, object_name, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue(maxsize=4)
+        done = object()
+
+        def blocking_chunks():
+            while True:
+                chunk = asyncio.run_coroutine_threadsafe(chunks.get(), loop).result()
+                if chunk is done:
+                    return
+                if isinstance(chunk, Exception):
+                    # Fail the upload so it is aborted instead of completed with partial data
+                    raise chunk
+                yield chunk
+
+        async def feed():
+            try:
+                async for chunk in source:
+                    await chunks.put(chunk)
+            except Exception as e:
+                await chunks.put(e)
+            else:
+                await chunks.put(done)
+
+        feeder = asyncio.ensure_future(feed())
+        try:
+            return await self._run(self.manager.upload_stream, blocking_chunks(), bucket_name, object_name, **kwargs)
+        finally:
+            # The uploader may have stopped reading early; do not leave the feeder blocked on a full queue
+            feeder.cancel()
+            await asyncio.gather(feeder, return_exceptions=True)
+
+    async def upload_compressed(self, source, bucket_name, object_name=None, encoding='gzip', **kwargs):
+        """Compress and upload a file or stream. See S3Manager.upload_compressed."""
+        return await self._run(self.manager.upload_compressed, source, bucket_name, object_name,
+                               encoding=encoding, **kwargs)
+
+    async def download_decompressed(self, bucket_name, object_name, file_path=None):
+        """Download and decompress an object. See S3Manager.download_decompressed."""
+        return await self._run(self.manager.download_decompressed, bucket_name, object_name, file_path)
+
+    async def download_file(self, bucket_name, object_name, file_path=None, config=None, callback=None):
+        """Download a file from an S3 bucket. See S3Manager.download_file."""
+        return await self._run(self.manager.download_file, bucket_name, object_name, file_path,
+                               config=config, callback=callback)
+
+    async def download_file_ranged(self, bucket_name, object_name, file_path=None, **kwargs):
+        """Download a large object with concurrent ranged GETs. See S3Manager.download_file_ranged."""
+        return await self._run(self.manager.download_file_ranged, bucket_name, object_name, file_path, **kwargs)
+
+    async def delete_object(self, bucket_name, object_name, version_id=None):
+        """Delete an object from an S3 bucket. See S3Manager.delete_object."""
+        return await self._run(self.manager.delete_object, bucket_name, object_name, version_id=version_id)
+
+    async def delete_objects(self, bucket_name, objects, max_workers=8):
+        """Delete many objects in batches. See S3Manager.delete_objects."""
+        return await self._run(self.manager.delete_objects, bucket_name, objects, max_workers=max_workers)
+
+    async def delete_prefix(self, bucket_name, prefix=None, versions=False, max_workers=8):
+        """Delete every object under a prefix. See S3Manager.delete_prefix."""
+        return await self._run(self.manager.delete_prefix, bucket_name, prefix, versions=versions,
+                               max_workers=max_workers)
+
+    async def copy_object(self, source_bucket, source_key, bucket_name, object_name):
+        """Copy an object server-side. See S3Manager.copy_object."""
+        return await self._run(self.manager.copy_object, source_bucket, source_key, bucket_name, object_name)
+
+    async def move_object(self, source_bucket, source_key, bucket_name, object_name):
+        """Move or rename an object server-side. See S3Manager.move_object."""
+        return await self._run(self.manager.move_object, source_bucket, source_key, bucket_name, object_name)
+
+    async def copy_prefix(self, source_bucket, source_prefix, bucket_name, target_prefix, move=False, max_workers=16):
+        """Copy or move every object under a prefix server-side. See S3Manager.copy_prefix."""
+        return await self._run(self.manager.copy_prefix, source_bucket, source_prefix, bucket_name, target_prefix,
+                               move=move, max_workers=max_workers)
+
+    async def sync_folder(self, folder_path, bucket_name, s3_folder=None, **kwargs):
+        """Synchronize a local folder with an S3 bucket. See S3Manager.sync_folder."""
+        return await self._run(self.manager.sync_folder, folder_path, bucket_name, s3_folder, **kwargs)
+
+    async def mirror_prefix(self, bucket_name, folder_path, prefix=None, **kwargs):
+        """Mirror a bucket prefix into a local folder. See S3Manager.mirror_prefix."""
+        return await self._run(self.manager.mirror_prefix, bucket_name, folder_path, prefix, **kwargs)
+
+    async def _iter_pages(self, bucket_name, prefix=None, delimiter=None, page_size=1000):
+        pages = iter(self.manager._iter_pages(bucket_name, prefix, delimiter, page_size))
+        end = object()
+        while True:
+            page = await self._run(next, pages, end)
+            if page is end:
+                return
+            yield page
+
+    async def iter_objects(self, bucket_name, prefix=None, delimiter=None, page_size=1000):
+        """
+        Asynchronously yield object metadata, fetching one listing page at a time.
+
+        :param bucket_name: Name of the bucket
+        :param prefix: Filter objects with this prefix
+        :param delimiter: Group keys on this character, e.g. '/'
+        :param page_size: Number of keys requested per ListObjectsV2 call (max 1,000)
+        :return: Async generator of object metadata dicts
+        :raises ClientError: If a listing call fails
+        """
+        async for page in self._iter_pages(bucket_name, prefix, delimiter, page_size):
+            for obj in page.get('Contents', []):
+                yield obj
+
+    async def iter_prefixes(self, bucket_name, prefix=None, delimiter='/'):
+        """
+        Asynchronously yield the common prefixes ("directories") directly under a prefix.
+
+        :param bucket_name: Name of the bucket
+        :param prefix: Parent prefix, e.g. 'images/'
+        :param delimiter: Character separating key levels
+        :return: Async generator of prefix strings
+        :raises ClientError: If a listing call fails
+        """
+        async for page in self._iter_pages(bucket_name, prefix, delimiter):
+            for common_prefix in page.get('CommonPrefixes', []):
+                yield common_prefix['Prefix']
@@ -0,0 +1,284 @@
+"""
+Run a manifest of S3 actions with a concurrent, restartable scheduler.
+
+The manifest is a CSV file with a header row or a JSON-lines file, one action per entry:
+
+    action,bucket,key,path,source_bucket,source_key
+    upload,my-bucket,data/1730804220.tsv,4_3/data/1730804220.tsv,,
+    download,my-bucket,data/1730804280.tsv,/tmp/1730804280.tsv,,
+    copy,my-bucket,archive/1730804220.tsv,,my-bucket,data/1730804220.tsv
+    move,my-bucket,final/a.tsv,,my-bucket,step_2_a.tsv
+    delete,my-bucket,tmp/old.tsv,,,
+
+Completed entries are appended to ``<manifest>.checkpoint`` as they finish, so rerunning the
+same manifest skips them and only retries what failed or never ran. Per-entry results are
+appended to ``<manifest>.report.jsonl``, so it keeps the results of every run; the last line
+for an entry id is its latest attempt. Deletes are grouped into 1,000-key DeleteObjects
+batches per bucket.
+
+Entries run concurrently, except that entries touching the same object (as destination or
+copy/move source) or the same local path run one after the other, in manifest order.
+
+    python batch.py actions.jsonl --workers 32 --quiet
+"""
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+from contextlib import redirect_stdout
+
+from main import S3Manager, bounded_map
+
+ACTIONS = ('upload', 'download', 'copy', 'move', 'delete')
+# Fields each action needs besides 'action' and 'bucket'
+REQUIRED_FIELDS = {
+    'upload': ('key', 'path'),
+    'download': ('key', 'path'),
+    'copy': ('key', 'source_key'),
+    'move': ('key', 'source_key'),
+    'delete': ('key',),
+}
+DELETE_BATCH_SIZE = 1000
+
+
+def read_manifest(manifest_path):
+    """
+    Yield manifest entries with a stable id (their 1-based position in the manifest).
+
+    :param manifest_path: Path to a .csv or .jsonl manifest
+    :return: Generator of dicts with 'id', 'action', 'bucket' and the fields their action needs
+    :raises ValueError: If a line is not a JSON object, has an unknown action or misses a field;
+                        the message gives its line number in the manifest
+    """
+    with open(manifest_path, newline='') as f:
+        if manifest_path.endswith('.csv'):
+            reader = csv.DictReader(f)
+            rows = ((reader.line_num, row) for row in reader)
+        else:
+            rows = ((line_number, line) for line_number, line in enumerate(f, start=1) if line.strip())
+        for entry_id, (line_number, row) in enumerate(rows, start=1):
+            if isinstance(row, str):
+                try:
+                    row = json.loads(row)
+                except ValueError as e:
+                    raise ValueError(f"Manifest line {line_number} is not valid JSON: {e}")
+                if not isinstance(row, dict):
+                    raise ValueError(f"Manifest line {line_number} is not a JSON object")
+            entry = {name: value for name, value in row.items() if value not in (None, '')}
+            if entry.get('action') not in ACTIONS:
+                raise ValueError(f"Manifest line {line_number} has unknown action '{entry.get('action')}'")
+            missing = [name for name in ('bucket',) + REQUIRED_FIELDS[entry['action']] if name not in entry]
+            if missing:
+                raise ValueError(f"Manifest line {line_number} ({entry['action']}) has no {', '.join(missing)}")
+            entry['id'] = entry_id
+            yield entry
+
+
+def entry_resources(entry):
+    """
+    List what an entry reads or writes, for ordering entries that share any of it.
+
+    :param entry: Manifest entry
+    :return: List of (bucket, key) tuples, and (None, absolute path) for a local file
+    """
+    resources = [(entry['bucket'], entry['key'])]
+    if entry['action'] in ('copy', 'move'):
+        resources.append((entry.get('source_bucket', entry['bucket']), entry['source_key']))
+    if 'path' in entry:
+        resources.append((None, os.path.abspath(entry['path'])))
+    return resources
+
+
+def load_checkpoint(checkpoint_path):
+    """
+    Read the ids of entries completed by previous runs.
+
+    :param checkpoint_path: Path to the checkpoint file
+    :return: Set of completed entry ids
+    """
+    if not os.path.exists(checkpoint_path):
+        return set()
+    with open(checkpoint_path) as f:
+        return {int(line) for line in f if line.strip().isdigit()}
+
+
+class BatchRunner:
+    """
+    Execute manifest entries on a bounded worker pool, checkpointing each success.
+    """
+
+    def __init__(self, s3_manager, manifest_path, max_workers=16, checkpoint_path=None, report_path=None):
+        self.s3_manager = s3_manager
+        self.manifest_path = manifest_path
+        self.max_workers = max_workers
+        self.checkpoint_path = checkpoint_path or f"{manifest_path}.checkpoint"
+        self.report_path = report_path or f"{manifest_path}.report.jsonl"
+        self.summary = {action: {'ok': 0, 'failed': 0} for action in ACTIONS}
+        self.summary['skipped'] = 0
+        self._lock = threading.Lock()
+        self._checkpoint = None
+        self._report = None
+
+    def _record(self, entry, ok, seconds, error=None):
+        result = {'id': entry['id'], 'action': entry['action'], 'bucket': entry.get('bucket'),
+                  'key': entry.get('key'), 'ok': ok, 'seconds': round(seconds, 3), 'error': error}
+        with self._lock:
+            self.summary[entry['action']]['ok' if ok else 'failed'] += 1
+            self._report.write(json.dumps(result) + '\n')
+            if ok:
+                self._checkpoint.write(f"{entry['id']}\n")
+                self._checkpoint.flush()
+
+    def _run_entry(self, entry):
+        s3 = self.s3_manager
+        action = entry['action']
+        started = time.monotonic()
+        if action == 'upload':
+            ok = s3.upload_file(entry['path'], entry['bucket'], entry['key'])
+        elif action == 'download':
+            directory = os.path.dirname(entry['path'])
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            ok = s3.download_file(entry['bucket'], entry['key'], entry['path'])
+        elif action == 'copy':
+            ok = s3.copy_object(entry.get('source_bucket', entry['bucket']), entry['source_key'],
+                                entry['bucket'], entry['key'])
+        else:
+            ok = s3.move_object(entry.get('source_bucket', entry['bucket']), entry['source_key'],
+                                entry['bucket'], entry['key'])
+        self._record(entry, ok, time.monotonic() - started)
+
+    def _run_deletes(self, entries):
+        started = time.monotonic()
+        report = self.s3_manager.delete_objects(entries[0]['bucket'], [entry['key'] for entry in entries],
+                                                max_workers=1)
+        errors = {error['Key']: error.get('Message') for error in report['errors']}
+        seconds = (time.monotonic() - started) / len(entries)
+        for entry in entries:
+            self._record(entry, entry['key'] not in errors, seconds, errors.get(entry['key']))
+
+    def _tasks(self, done):
+        """
+        Yield (fn, arg, waits, finished) tasks in manifest order.
+
+        Each task waits for the ``finished`` events of the previous tasks on the same resources,
+        and those are always yielded before it. A pending delete batch is therefore yielded as
+        soon as a later entry touches one of its keys, rather than when it is full.
+        """
+        latest = {}  # resource -> finished event of the last task touching it
+        deletes = {}  # bucket -> entries of the delete batch being filled
+        pending_deletes = {}  # (bucket, key) -> bucket of the delete batch holding it
+
+        def task(fn, arg, entries):
+            finished = threading.Event()
+            waits = set()
+            for entry in entries:
+                for resource in entry_resources(entry):
+                    if resource in latest:
+                        waits.add(latest[resource])
+                    latest[resource] = finished
+            waits.discard(finished)
+            return fn, arg, waits, finished
+
+        def flush(bucket):
+            entries = deletes.pop(bucket)
+            for entry in entries:
+                pending_deletes.pop((entry['bucket'], entry['key']), None)
+            return task(self._run_deletes, entries, entries)
+
+        for entry in read_manifest(self.manifest_path):
+            if entry['id'] in done:
+                self.summary['skipped'] += 1
+                continue
+            if entry['action'] != 'delete':
+                for bucket in {pending_deletes[resource] for resource in entry_resources(entry)
+                               if resource in pending_deletes}:
+                    yield flush(bucket)
+                yield task(self._run_entry, entry, [entry])
+                continue
+            pending = deletes.setdefault(entry['bucket'], [])
+            pending.append(entry)
+            pending_deletes[(entry['bucket'], entry['key'])] = entry['bucket']
+            if len(pending) == DELETE_BATCH_SIZE:
+                yield flush(entry['bucket'])
+        for bucket in list(deletes):
+            yield flush(bucket)
+
+    def _run_task(self, task):
+        fn, arg, waits, finished = task
+        try:
+            # Tasks are submitted in manifest order to a FIFO pool, so what we wait for has started
+            for event in waits:
+                event.wait()
+            fn(arg)
+        except Exception as e:
+            # A bad entry (missing field, unreadable file) must not stop the rest of the batch
+            for entry in arg if isinstance(arg, list) else [arg]:
+                self._record(entry, False, 0.0, repr(e))
+        finally:
+            finished.set()
+
+    def validate(self):
+        """
+        Read the whole manifest once, so a bad entry is reported before anything runs.
+
+        :return: Number of entries
+        :raises ValueError: On the first invalid entry
+        """
+        return sum(1 for _ in read_manifest(self.manifest_path))
+
+    def run(self):
+        """
+        Run every entry not yet checkpointed.
+
+        :return: Summary dict with ok/failed counts per action, skipped count and elapsed seconds
+        :raises ValueError: If the manifest has an invalid entry; nothing is run then
+        """
+        self.validate()
+        started = time.monotonic()
+        done = load_checkpoint(self.checkpoint_path)
+        with open(self.checkpoint_path, 'a') as self._checkpoint, open(self.report_path, 'a') as self._report:
+            for _ in bounded_map(self._run_task, self._tasks(done), max_workers=self.max_workers):
+                pass
+        self.summary['seconds'] = round(time.monotonic() - started, 3)
+        return self.summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a CSV/JSONL manifest of S3 actions.')
+    parser.add_argument('manifest', help='Path to a .csv or .jsonl manifest')
+    parser.add_argument('--workers', type=int, default=16, help='Number of entries run at the same time')
+    parser.add_argument('--region', help='AWS region')
+    parser.add_argument('--profile', help='AWS profile name')
+    parser.add_argument('--endpoint-url', help='Custom S3 endpoint, e.g. a local MinIO')
+    parser.add_argument('--quiet', action='store_true', help='Hide per-object messages')
+    args = parser.parse_args()
+
+    s3_manager = S3Manager(region=args.region, profile_name=args.profile, endpoint_url=args.endpoint_url,
+                           max_pool_connections=max(64, args.workers * 2))
+    runner = BatchRunner(s3_manager, args.manifest, max_workers=args.workers)
+    try:
+        if args.quiet:
+            with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                summary = runner.run()
+        else:
+            summary = runner.run()
+    except ValueError as e:
+        print(f"Invalid manifest '{args.manifest}': {e}")
+        return 2
+
+    failed = sum(summary[action]['failed'] for action in ACTIONS)
+    for action in ACTIONS:
+        if summary[action]['ok'] or summary[action]['failed']:
+            print(f"{action}: {summary[action]['ok']} ok, {summary[action]['failed']} failed")
+    print(f"Skipped {summary['skipped']} entries completed by a previous run; took {summary['seconds']}s.")
+    print(f"Results written to '{runner.report_path}'.")
+    if failed:
+        print(f"{failed} entries failed; rerun the same manifest to retry them.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
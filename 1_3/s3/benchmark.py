@@ -0,0 +1,265 @@
+"""
+Benchmark the S3Manager transfer paths against a local S3-compatible stand-in.
+
+By default a moto server is started in a subprocess (pip install "moto[server]"), so the
+stand-in's memory does not count towards the reported peak RSS. Pass --endpoint-url to run
+against an already running MinIO or moto server instead.
+
+    python benchmark.py
+    python benchmark.py --scenario small --scale 0.1 --json results.json
+    python benchmark.py --endpoint-url http://localhost:9000
+
+A scenario stops at the first operation that reports a failure, and the benchmark exits with
+status 1 instead of printing throughput for an incomplete run.
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from contextlib import redirect_stdout
+
+from main import MB, S3Manager
+
+# name -> list of (file count, file size in bytes)
+SCENARIOS = {
+    'small': [(2000, 16 * 1024)],
+    'huge': [(3, 256 * MB)],
+    'mixed': [(500, 64 * 1024), (20, 4 * MB), (2, 96 * MB)],
+}
+OPERATIONS = ['upload', 'list', 'sync', 'download', 'delete']
+
+
+class LatencyRecorder:
+    """
+    Record the latency of every S3 API call made by a client, using botocore's event hooks.
+    """
+
+    def __init__(self, client):
+        self.samples = []
+        client.meta.events.register('before-call.s3', self._before)
+        client.meta.events.register('after-call.s3', self._after)
+
+    def _before(self, context, **kwargs):
+        context['benchmark_started'] = time.perf_counter()
+
+    def _after(self, context, **kwargs):
+        started = context.get('benchmark_started')
+        if started is not None:
+            self.samples.append(time.perf_counter() - started)
+
+    def reset(self):
+        self.samples = []
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return round(peak / MB if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def current_rss_mb():
+    # Resident set size right now; None where /proc is not available (e.g. macOS)
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / MB
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class RssSampler:
+    """
+    Sample the process RSS on a background thread while one operation runs.
+
+    ru_maxrss is the peak of the whole process, so after the heaviest operation every later
+    row would show the same number. Where the current RSS cannot be read, that process-wide
+    peak is reported instead.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while True:
+            rss = current_rss_mb()
+            if rss is not None:
+                self.peak = max(self.peak or 0.0, rss)
+            if self._stop.wait(self.interval):
+                return
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        rss = current_rss_mb()
+        if rss is not None:
+            self.peak = max(self.peak or 0.0, rss)
+
+    def peak_mb(self):
+        return round(self.peak, 1) if self.peak is not None else peak_rss_mb()
+
+
+def start_moto_server():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen([sys.executable, '-m', 'moto.server', '-p', str(port)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    endpoint_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"{endpoint_url}/moto-api/", timeout=1)
+            return process, endpoint_url
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError('moto server did not start; install it with: pip install "moto[server]"')
+
+
+def make_files(folder, layout, scale):
+    total_bytes = 0
+    for group, (count, size) in enumerate(layout):
+        count = max(1, int(count * scale)) if size < MB else count
+        size = max(1, int(size * scale)) if size >= MB else size
+        directory = os.path.join(folder, f"group{group}")
+        os.makedirs(directory)
+        block = os.urandom(min(size, MB))
+        for i in range(count):
+            with open(os.path.join(directory, f"file{i:06d}.bin"), 'wb') as f:
+                remaining = size
+                while remaining:
+                    f.write(block[:min(remaining, len(block))])
+                    remaining -= min(remaining, len(block))
+            total_bytes += size
+    return total_bytes
+
+
+def succeeded(result):
+    # Bulk operations return True/False, a report dict with a 'failed' count, or a listing count
+    if isinstance(result, dict):
+        return not result['failed']
+    return result is not None and result is not False
+
+
+def run_scenario(s3_manager, recorder, name, layout, scale, workdir, max_workers, quiet=False):
+    bucket_name = f"benchmark-{name}-{int(time.time())}"
+    source = os.path.join(workdir, name, 'source')
+    target = os.path.join(workdir, name, 'target')
+    os.makedirs(source)
+    total_bytes = make_files(source, layout, scale)
+    files = sum(len(names) for _, _, names in os.walk(source))
+
+    operations = {
+        'upload': lambda: s3_manager.sync_folder(source, bucket_name, 'data', max_workers=max_workers),
+        'list': lambda: sum(1 for _ in s3_manager.iter_objects(bucket_name, prefix='data/')),
+        'sync': lambda: s3_manager.sync_folder(source, bucket_name, 'data', max_workers=max_workers, delta=True),
+        'download': lambda: s3_manager.mirror_prefix(bucket_name, target, prefix='data/', max_workers=max_workers),
+        'delete': lambda: s3_manager.delete_prefix(bucket_name, max_workers=max_workers),
+    }
+    moved_bytes = {'upload': total_bytes, 'download': total_bytes}
+
+    results = []
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull if quiet else sys.stdout):
+        if not s3_manager.create_bucket(bucket_name):
+            raise RuntimeError(f"Scenario '{name}': could not create bucket '{bucket_name}'")
+        for operation in OPERATIONS:
+            recorder.reset()
+            started = time.perf_counter()
+            with RssSampler() as sampler:
+                result = operations[operation]()
+            seconds = time.perf_counter() - started
+            if not succeeded(result):
+                raise RuntimeError(f"Scenario '{name}': {operation} failed, see the output above")
+            samples = recorder.samples
+            results.append({
+                'scenario': name,
+                'operation': operation,
+                'files': files,
+                'seconds': round(seconds, 3),
+                'requests': len(samples),
+                'ops_per_s': round(files / seconds, 1),
+                'mb_per_s': round(moved_bytes.get(operation, 0) / MB / seconds, 1),
+                'p50_ms': round(statistics.median(samples) * 1000, 2) if samples else 0.0,
+                'p99_ms': round(percentile(samples, 99) * 1000, 2),
+                'peak_rss_mb': sampler.peak_mb(),
+            })
+        s3_manager.s3_client.delete_bucket(Bucket=bucket_name)
+    return results
+
+
+def print_table(results):
+    columns = ['scenario', 'operation', 'files', 'seconds', 'requests', 'ops_per_s', 'mb_per_s',
+               'p50_ms', 'p99_ms', 'peak_rss_mb']
+    widths = [max(len(column), *(len(str(row[column])) for row in results)) for column in columns]
+    print('  '.join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in results:
+        print('  '.join(str(row[column]).ljust(width) for column, width in zip(columns, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark S3Manager against a local S3 stand-in.')
+    parser.add_argument('--endpoint-url', help='S3-compatible endpoint. Starts a moto server if omitted')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), action='append',
+                        help='Scenario to run, may be repeated. Runs all by default')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Multiply file counts (small files) and sizes (large files) by this factor')
+    parser.add_argument('--max-workers', type=int, default=16, help='Worker pool size for bulk operations')
+    parser.add_argument('--json', dest='json_path', help='Also write the results to this JSON file')
+    parser.add_argument('--quiet', action='store_true', help='Hide S3Manager messages')
+    args = parser.parse_args()
+
+    # The stand-in accepts any credentials, but botocore still needs some to sign requests
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'benchmark')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark')
+
+    server = None
+    endpoint_url = args.endpoint_url
+    if endpoint_url is None:
+        server, endpoint_url = start_moto_server()
+    workdir = tempfile.mkdtemp(prefix='s3-benchmark-')
+    try:
+        s3_manager = S3Manager(region='us-east-1', endpoint_url=endpoint_url)
+        recorder = LatencyRecorder(s3_manager.s3_client)
+        results = []
+        for name in args.scenario or sorted(SCENARIOS):
+            try:
+                results.extend(run_scenario(s3_manager, recorder, name, SCENARIOS[name], args.scale,
+                                            workdir, args.max_workers, quiet=args.quiet))
+            except RuntimeError as e:
+                print(e)
+                return 1
+        print_table(results)
+        if args.json_path:
+            with open(args.json_path, 'w') as f:
+                json.dump(results, f, indent=2)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        if server:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
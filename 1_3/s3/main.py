@@ -1,29 +1,865 @@
 import boto3
-from botocore.exceptions import ClientError
+from boto3.exceptions import S3UploadFailedError
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError, HTTPClientError
+from botocore.exceptions import ConnectionError as BotoConnectionError
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 import sys
 import argparse
+import functools
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
 import os
+import queue
+import random
+import threading
+import time
+import zlib
+from collections import deque
 from pathlib import Path
 
+try:
+    import zstandard
+    from zstandard import ZstdError
+except ImportError:
+    zstandard = None
+
+    class ZstdError(Exception):
+        pass
+
+MB = 1024 * 1024
+MANIFEST_NAME = '.s3manifest.json'
+MAX_POOL_CONNECTIONS = 64
+MAX_COPY_OBJECT_SIZE = 5 * 1024 * MB
+CONTENT_INDEX_DIR = Path.home() / '.s3manager'
+THROTTLE_CODES = {'SlowDown', 'Throttling', 'ThrottlingException', 'RequestLimitExceeded', 'TooManyRequests',
+                  'TooManyRequestsException', 'RequestThrottled', 'ServiceUnavailable', 'InternalError'}
+
+_sessions = {}
+_clients = {}
+_cache_lock = threading.Lock()
+
+
+def get_session(profile_name=None, region=None):
+    """
+    Return a process-wide boto3 Session for a profile and region, creating it once.
+
+    :param profile_name: AWS profile name. If None, the default credential chain is used
+    :param region: AWS region. If None, the default region is used
+    :return: boto3.Session
+    """
+    key = (profile_name, region)
+    with _cache_lock:
+        session = _sessions.get(key)
+        if session is None:
+            if profile_name:
+                session = boto3.Session(profile_name=profile_name, region_name=region)
+            else:
+                session = boto3.Session(region_name=region)
+            _sessions[key] = session
+        return session
+
+
+def get_client(service_name, region=None, profile_name=None, max_pool_connections=MAX_POOL_CONNECTIONS,
+               tcp_keepalive=True, endpoint_url=None, **config):
+    """
+    Return a process-wide cached boto3 client.
+
+    Clients are thread-safe and expensive to build (endpoint resolution, credential lookup and
+    a new connection pool), so one client is shared per (profile, region, service, config).
+    Its connection pool is sized for the bulk operations' worker counts and keeps TCP
+    connections alive, so TLS handshakes are reused across calls.
+
+    :param service_name: Service name, e.g. 's3'
+    :param region: AWS region. If None, the default region is used
+    :param profile_name: AWS profile name. If None, the default credential chain is used
+    :param max_pool_connections: Maximum number of pooled HTTP connections
+    :param tcp_keepalive: Enable TCP keep-alive on pooled connections
+    :param endpoint_url: Custom endpoint, e.g. a local MinIO or moto server
+    :param config: Extra botocore Config options, e.g. retries or connect_timeout
+    :return: boto3 client
+    """
+    config.update(max_pool_connections=max_pool_connections, tcp_keepalive=tcp_keepalive)
+    key = (profile_name, region, service_name, endpoint_url, repr(sorted(config.items())))
+    session = get_session(profile_name, region)
+    # Sessions are not thread-safe, so clients are also built under the lock
+    with _cache_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = session.client(service_name, endpoint_url=endpoint_url, config=Config(**config))
+            _clients[key] = client
+        return client
+
+
+def compute_etag(file_path, multipart_threshold=8 * MB, multipart_chunksize=8 * MB):
+    """
+    Compute the ETag S3 assigns to a file uploaded with the given transfer settings.
+
+    Single-part uploads get the hex MD5 of the content; multipart uploads get the MD5 of the
+    concatenated part digests followed by ``-<part count>``. Objects encrypted with SSE-KMS
+    or SSE-C do not use MD5 ETags and will never match.
+
+    :param file_path: Path to the local file
+    :param multipart_threshold: File size in bytes above which multipart upload is used
+    :param multipart_chunksize: Size in bytes of each multipart part
+    :return: ETag string without surrounding quotes
+    """
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        if size < multipart_threshold:
+            digest = hashlib.md5()
+            for chunk in iter(lambda: f.read(MB), b''):
+                digest.update(chunk)
+            return digest.hexdigest()
+        part_digests = [hashlib.md5(chunk).digest() for chunk in iter(lambda: f.read(multipart_chunksize), b'')]
+    return f"{hashlib.md5(b''.join(part_digests)).hexdigest()}-{len(part_digests)}"
+
+
+def compute_sha256(file_path):
+    """
+    Compute the hex SHA-256 digest of a file's content.
+
+    :param file_path: Path to the local file
+    :return: Hex digest string
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(MB), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(manifest_path):
+    """
+    Load a sync manifest mapping S3 keys to the size, mtime and ETag of the local file.
+
+    :param manifest_path: Path to the manifest JSON file
+    :return: Manifest dict, empty if the file does not exist or cannot be parsed
+    """
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest_path, manifest):
+    """
+    Atomically write a sync manifest.
+
+    :param manifest_path: Path to the manifest JSON file
+    :param manifest: Manifest dict to store
+    """
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def bounded_map(fn, items, max_workers=8, max_pending=None):
+    """
+    Apply fn to items on a thread pool, consuming items lazily.
+
+    At most ``max_pending`` calls (default ``2 * max_workers``) are queued or running at
+    once, so items can come from an unbounded generator such as a bucket listing.
+
+    :param fn: Callable applied to each item
+    :param items: Iterable of items
+    :param max_workers: Number of worker threads
+    :param max_pending: Maximum number of submitted but unfinished calls
+    :return: Generator of results in completion order
+    """
+    max_workers = max(1, max_workers)
+    max_pending = max_pending or 2 * max_workers
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = set()
+        for item in items:
+            if len(pending) >= max_pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    yield future.result()
+            pending.add(executor.submit(fn, item))
+        for future in as_completed(pending):
+            yield future.result()
+
+
+def multipart_layout(size, etag, part_size=None):
+    """
+    Work out the multipart threshold and part size that produced an S3 ETag.
+
+    Multipart ETags only record the part count. Pass the exact size of part 1
+    (``head_object(PartNumber=1)['ContentLength']``) when it is known; otherwise the part
+    size is guessed as the smallest whole number of MiB giving the same part count.
+
+    :param size: Object size in bytes
+    :param etag: ETag without surrounding quotes
+    :param part_size: Size in bytes of the object's first part, if known
+    :return: (multipart_threshold, multipart_chunksize) to pass to compute_etag
+    """
+    if '-' not in etag:
+        return size + 1, 8 * MB
+    if part_size is None:
+        parts = int(etag.rsplit('-', 1)[1])
+        part_size = max(MB, -(-size // parts // MB) * MB) if parts > 1 else max(size, 1)
+    return min(part_size, size), part_size
+
+
+def iter_parts(source, part_size):
+    """
+    Re-chunk a stream into buffers of exactly ``part_size`` bytes (the last may be shorter).
+
+    :param source: bytes-like object, file-like object with read(), or iterable of bytes chunks
+    :param part_size: Size in bytes of each yielded buffer
+    :return: Generator of bytes objects
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    if hasattr(source, 'read'):
+        while True:
+            buffer = source.read(part_size)
+            if isinstance(buffer, str):
+                buffer = buffer.encode()
+            if not buffer:
+                return
+            # read() may return fewer bytes than asked for on pipes and sockets
+            while len(buffer) < part_size:
+                more = source.read(part_size - len(buffer))
+                if not more:
+                    break
+                buffer += more.encode() if isinstance(more, str) else more
+            yield buffer
+            if len(buffer) < part_size:
+                return
+    else:
+        pending = bytearray()
+        for chunk in source:
+            pending += chunk.encode() if isinstance(chunk, str) else chunk
+            while len(pending) >= part_size:
+                yield bytes(pending[:part_size])
+                del pending[:part_size]
+        if pending:
+            yield bytes(pending)
+
+
+def compress_chunks(chunks, encoding='gzip', level=None, threads=1, block_size=4 * MB):
+    """
+    Compress a stream of bytes chunks on the fly.
+
+    gzip with ``threads > 1`` compresses independent ``block_size`` blocks in parallel and
+    emits them as consecutive gzip members, which standard gzip readers decompress as one
+    stream. zstd (needs the ``zstandard`` package) uses the library's own worker threads.
+
+    :param chunks: Iterable of bytes chunks
+    :param encoding: 'gzip' or 'zstd'
+    :param level: Compression level. Defaults to 6 for gzip and 3 for zstd
+    :param threads: Number of compression threads
+    :param block_size: Input block size for parallel gzip
+    :return: Generator of compressed bytes chunks
+    """
+    if encoding == 'zstd':
+        if zstandard is None:
+            raise ValueError("zstd compression needs the 'zstandard' package: pip install zstandard")
+        compressor = zstandard.ZstdCompressor(level=level or 3, threads=threads if threads > 1 else 0).compressobj()
+        for chunk in chunks:
+            yield compressor.compress(chunk)
+        yield compressor.flush()
+        return
+    if encoding != 'gzip':
+        raise ValueError(f"Unsupported content encoding '{encoding}'")
+
+    level = 6 if level is None else level
+    if threads <= 1:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            yield compressor.compress(chunk)
+        yield compressor.flush()
+        return
+
+    # zlib releases the GIL, so blocks compress in parallel; results are emitted in input order
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        pending = deque()
+        for block in iter_parts(chunks, block_size):
+            pending.append(executor.submit(gzip.compress, block, level, mtime=0))
+            if len(pending) > threads:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def decompress_chunks(chunks, encoding):
+    """
+    Decompress a stream of bytes chunks produced by compress_chunks or any gzip/zstd writer.
+
+    :param chunks: Iterable of compressed bytes chunks
+    :param encoding: 'gzip' or 'zstd'
+    :return: Generator of decompressed bytes chunks
+    :raises ValueError: If the stream is empty or ends in the middle of a gzip member or zstd frame
+    """
+    if encoding == 'zstd':
+        if zstandard is None:
+            raise ValueError("zstd decompression needs the 'zstandard' package: pip install zstandard")
+        new_decompressor = zstandard.ZstdDecompressor().decompressobj
+    else:
+        new_decompressor = functools.partial(zlib.decompressobj, 31)
+    decompressor = new_decompressor()
+    finished = 0
+    in_member = False
+    for chunk in chunks:
+        while chunk:
+            yield decompressor.decompress(chunk)
+            in_member = True
+            # A new gzip member or zstd frame starts where the previous one ended
+            chunk = decompressor.unused_data
+            if decompressor.eof:
+                decompressor = new_decompressor()
+                finished += 1
+                in_member = False
+            else:
+                chunk = b''
+    if in_member or not finished:
+        # Only a complete member or frame carries its checksum, so anything else is truncated
+        raise ValueError(f"Truncated {encoding} stream")
+
+
+def is_throttle(error):
+    """
+    Tell whether an S3 error means "slow down" rather than a real failure.
+
+    :param error: Exception raised by a boto3 call
+    :return: True for throttling and transient 5xx errors
+    """
+    if isinstance(error, ClientError):
+        code = error.response.get('Error', {}).get('Code')
+        status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+        return code in THROTTLE_CODES or status in (429, 500, 503)
+    if isinstance(error, S3UploadFailedError):
+        # The transfer manager flattens the part's ClientError into the message
+        return any(code in str(error) for code in THROTTLE_CODES)
+    return False
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency controller shared by all bulk operations of an S3Manager.
+
+    Every S3 request made by a bulk operation takes a slot. The number of slots grows by one
+    after each window of ``limit`` successful requests (additive increase) and is halved when
+    S3 throttles (multiplicative decrease), so throughput converges on what the bucket's
+    partitions sustain. Throttled requests are retried on their own with exponential backoff
+    and full jitter, so a single SlowDown never fails a whole run.
+
+    Managed transfers (upload_file, download_file) take one slot through attempt() and are not
+    retried here: their parts are retried one by one by the client's botocore retry mode, and each
+    retried part is reported back through on_throttle().
+    """
+
+    def __init__(self, max_concurrency=64, min_concurrency=1, max_attempts=8, base_delay=0.2, max_delay=20.0):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.limit = max_concurrency
+        self.in_flight = 0
+        self.throttles = 0
+        self.retries = 0
+        self._successes = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def on_success(self):
+        with self._condition:
+            self._successes += 1
+            if self._successes >= self.limit and self.limit < self.max_concurrency:
+                self._successes = 0
+                self.limit += 1
+                self._condition.notify()
+
+    def on_throttle(self):
+        with self._condition:
+            self.throttles += 1
+            now = time.monotonic()
+            # Requests already in flight when the limit was cut also get throttled; count that burst once
+            if now - self._last_decrease > self.base_delay:
+                self._last_decrease = now
+                self.limit = max(self.min_concurrency, self.limit // 2)
+                self._successes = 0
+
+    def backoff(self, attempt):
+        time.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+
+    def attempt(self, fn, *args, **kwargs):
+        """
+        Run fn once in a slot and feed the outcome into the concurrency limit.
+
+        :param fn: Callable making one request or one managed transfer
+        :return: Whatever fn returns
+        :raises: Whatever fn raises
+        """
+        self.acquire()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            if is_throttle(e):
+                self.on_throttle()
+            raise
+        finally:
+            self.release()
+        self.on_success()
+        return result
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Run one S3 request under the limiter, retrying it while S3 throttles.
+
+        fn should not retry on its own: dropped connections are retried here as well, without
+        lowering the limit.
+
+        :param fn: Callable making exactly one request
+        :return: Whatever fn returns
+        :raises: The last error if it is not retryable or attempts are exhausted
+        """
+        for attempt in range(self.max_attempts):
+            try:
+                return self.attempt(fn, *args, **kwargs)
+            except Exception as e:
+                retryable = is_throttle(e) or isinstance(e, (BotoConnectionError, HTTPClientError))
+                if not retryable or attempt == self.max_attempts - 1:
+                    raise
+            with self._condition:
+                self.retries += 1
+            self.backoff(attempt)
+
+    def stats(self):
+        with self._condition:
+            return {'limit': self.limit, 'in_flight': self.in_flight, 'throttles': self.throttles,
+                    'retries': self.retries}
+
+
+# (bucket, key) -> {'retries': n, 'limiter': AdaptiveLimiter} for managed transfers in progress
+_transfers = {}
+_transfers_lock = threading.Lock()
+
+
+def _tag_transfer_request(params, context, **kwargs):
+    # before-parameter-build: remember which object a request is about, to credit its retries to that object's transfer
+    context['s3manager_object'] = (params.get('Bucket'), params.get('Key'))
+
+
+def _count_transfer_retries(context, parsed=None, exception=None, **kwargs):
+    """
+    after-call hook crediting botocore's retries of one request to the managed transfer of its object.
+
+    Parts of a managed transfer are retried by botocore, not by the limiter, so this is where the
+    limiter learns that S3 throttled them and where the transfer's retry count comes from.
+    """
+    if exception is not None:
+        parsed = getattr(exception, 'response', None)
+    retries = (parsed or {}).get('ResponseMetadata', {}).get('RetryAttempts', 0)
+    if not retries:
+        return
+    with _transfers_lock:
+        watcher = _transfers.get(context.get('s3manager_object'))
+        if watcher:
+            watcher['retries'] += retries
+    if watcher:
+        watcher['limiter'].on_throttle()
+
+
+def interleave_by_prefix(items, key, depth=1):
+    """
+    Reorder items round-robin across their top-level key prefixes.
+
+    S3 scales request rates per prefix, so spreading consecutive requests over prefixes
+    avoids hammering one partition while the others sit idle.
+
+    :param items: List of items
+    :param key: Callable returning the S3 key of an item
+    :param depth: Number of leading key levels forming the prefix
+    :return: New list with the same items
+    """
+    groups = {}
+    for item in items:
+        groups.setdefault('/'.join(key(item).split('/')[:depth]), deque()).append(item)
+    queues = deque(groups.values())
+    ordered = []
+    while queues:
+        group = queues.popleft()
+        ordered.append(group.popleft())
+        if group:
+            queues.append(group)
+    return ordered
+
+
+class LatencyHistogram:
+    """
+    Thread-safe in-process metrics hook aggregating events per operation.
+
+    Latencies go into exponential buckets (1 ms doubling up to ~9 min), so memory stays
+    constant however many requests are recorded. Pass an instance in S3Manager's
+    ``metrics_hooks`` and call report() or summary() at the end of a run.
+    """
+
+    BOUNDS = [0.001 * 2 ** i for i in range(20)]
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        with self._lock:
+            stats = self._stats.setdefault((event['kind'], event['op']), {
+                'count': 0, 'errors': 0, 'seconds': 0.0, 'bytes': 0, 'retries': 0, 'max_concurrency': 0,
+                'buckets': [0] * (len(self.BOUNDS) + 1),
+            })
+            stats['count'] += 1
+            stats['errors'] += 0 if event['ok'] else 1
+            stats['seconds'] += event['seconds']
+            stats['bytes'] += event.get('bytes', 0)
+            stats['retries'] += event.get('retries', 0)
+            stats['max_concurrency'] = max(stats['max_concurrency'], event.get('concurrency', 0))
+            bucket = next((i for i, bound in enumerate(self.BOUNDS) if event['seconds'] <= bound), len(self.BOUNDS))
+            stats['buckets'][bucket] += 1
+
+    def _percentile(self, stats, pct):
+        rank = pct / 100 * stats['count']
+        seen = 0
+        for i, count in enumerate(stats['buckets']):
+            seen += count
+            if count and seen >= rank:
+                return self.BOUNDS[i] if i < len(self.BOUNDS) else float('inf')
+        return 0.0
+
+    def summary(self):
+        """
+        Summarize recorded events.
+
+        :return: List of dicts per (kind, op), sorted by total time, with count, errors, retries,
+                 total seconds, MB moved, MB/s and p50/p90/p99 latency upper bounds in ms
+        """
+        with self._lock:
+            rows = []
+            for (kind, op), stats in self._stats.items():
+                rows.append({
+                    'kind': kind,
+                    'op': op,
+                    'count': stats['count'],
+                    'errors': stats['errors'],
+                    'retries': stats['retries'],
+                    'seconds': round(stats['seconds'], 3),
+                    'mb': round(stats['bytes'] / MB, 2),
+                    'mb_per_s': round(stats['bytes'] / MB / stats['seconds'], 2) if stats['seconds'] else 0.0,
+                    'p50_ms': round(self._percentile(stats, 50) * 1000, 1),
+                    'p90_ms': round(self._percentile(stats, 90) * 1000, 1),
+                    'p99_ms': round(self._percentile(stats, 99) * 1000, 1),
+                    'max_concurrency': stats['max_concurrency'],
+                })
+        return sorted(rows, key=lambda row: row['seconds'], reverse=True)
+
+    def report(self):
+        """
+        Print the summary as a table, slowest operations first.
+        """
+        rows = self.summary()
+        if not rows:
+            print("No S3 operations recorded.")
+            return
+        columns = list(rows[0])
+        widths = [max(len(column), *(len(str(row[column])) for row in rows)) for column in columns]
+        print('  '.join(column.ljust(width) for column, width in zip(columns, widths)))
+        for row in rows:
+            print('  '.join(str(row[column]).ljust(width) for column, width in zip(columns, widths)))
+
+
+class JsonLinesTrace:
+    """
+    Metrics hook appending every event as one JSON object per line, for dashboards or offline analysis.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a')
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        line = json.dumps(event, default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def request_bytes(op, args, kwargs, result):
+    """
+    Best-effort payload size of a finished S3 request, for metrics.
+    """
+    try:
+        if op in ('upload_file', 'download_file'):
+            return os.path.getsize(kwargs['Filename'])
+        if op in ('put_object', 'upload_part'):
+            body = kwargs.get('Body', b'')
+            return len(body) if isinstance(body, (bytes, bytearray, memoryview)) else 0
+        if op == 'get_object':
+            return result.get('ContentLength', 0)
+        if op == 'upload_part_copy':
+            start, end = kwargs['CopySourceRange'].split('=')[1].split('-')
+            return int(end) - int(start) + 1
+    except (OSError, IndexError, KeyError, ValueError, AttributeError):
+        pass
+    return 0
+
+
+def instrumented(method):
+    """
+    Emit an 'operation' metrics event for each call of an S3Manager method.
+
+    The event fails when the method raises, returns False or None, returns a report dict
+    with failures, or calls _mark_failed() (listings return [] on errors as well). Other
+    values, including empty listings, are successes.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not self.metrics_hooks:
+            return method(self, *args, **kwargs)
+        started = time.monotonic()
+        result = None
+        error = None
+        outer_failed = getattr(self._local, 'failed', False)
+        self._local.failed = False
+        try:
+            result = method(self, *args, **kwargs)
+            return result
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            failed = self._local.failed
+            self._local.failed = outer_failed
+            if isinstance(result, dict):
+                ok = error is None and not result['failed']
+            else:
+                ok = error is None and not failed and result is not False and result is not None
+            self._emit({'kind': 'operation', 'op': method.__name__, 'seconds': time.monotonic() - started,
+                        'ok': ok, 'error': repr(error) if error else None})
+    return wrapper
+
+
+class TransferProgress:
+    """
+    Thread-safe counter of files and bytes moved by a bulk transfer.
+
+    An instance is shared by all workers of one operation and is passed to boto3 as the
+    per-file transfer callback, so it sees every chunk of every multipart upload.
+    """
+
+    def __init__(self, total_files=0, total_bytes=0):
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.files_done = 0
+        self.files_failed = 0
+        self.bytes_done = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __call__(self, bytes_amount):
+        with self._lock:
+            self.bytes_done += bytes_amount
+
+    def file_finished(self, ok):
+        with self._lock:
+            if ok:
+                self.files_done += 1
+            else:
+                self.files_failed += 1
+
+    def report(self):
+        """
+        Summarize the transfer so far.
+
+        :return: Dict with file/byte counts, elapsed seconds and throughput in MB/s
+        """
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            return {
+                'files': self.files_done,
+                'failed': self.files_failed,
+                'total_files': self.total_files,
+                'bytes': self.bytes_done,
+                'total_bytes': self.total_bytes,
+                'seconds': round(elapsed, 3),
+                'mb_per_s': round(self.bytes_done / MB / elapsed, 2) if elapsed > 0 else 0.0,
+            }
+
+
 class S3Manager:
-    def __init__(self, region=None, profile_name=None):
+    def __init__(self, region=None, profile_name=None, max_pool_connections=MAX_POOL_CONNECTIONS, endpoint_url=None,
+                 limiter=None, metrics_hooks=None, trace_path=None):
         """
         Initialize the S3Manager with optional region and AWS profile.
 
+        The underlying client comes from the process-wide cache, so creating several managers
+        for the same profile and region is cheap and they share one connection pool.
+
         :param region: AWS region, e.g., 'us-west-2'. If None, default region is used.
         :param profile_name: AWS profile name from the credentials file. If None, default profile is used.
+        :param max_pool_connections: Size of the shared client's HTTP connection pool
+        :param endpoint_url: Custom S3 endpoint, e.g. a local MinIO or moto server
+        :param limiter: AdaptiveLimiter shared by bulk operations. Defaults to one sized to the connection pool
+        :param metrics_hooks: Callables receiving a dict per S3 request and per manager operation,
+                              e.g. a LatencyHistogram
+        :param trace_path: If given, also append every event to this JSON-lines file. Call close()
+                           or use the manager as a context manager to close it
         """
+        self.limiter = limiter or AdaptiveLimiter(max_concurrency=max_pool_connections)
+        self.metrics_hooks = list(metrics_hooks or [])
+        self._trace = None
+        self._local = threading.local()
+        if trace_path:
+            self._trace = JsonLinesTrace(trace_path)
+            self.metrics_hooks.append(self._trace)
+        self.region = region
+        self.profile_name = profile_name
+        self.endpoint_url = endpoint_url
+        self._s3_resource = None
         try:
-            if profile_name:
-                session = boto3.Session(profile_name=profile_name, region_name=region)
-            else:
-                session = boto3.Session(region_name=region)
-            self.s3_client = session.client('s3')
-            self.s3_resource = session.resource('s3')
+            # Adaptive retry mode retries each throttled request of a managed transfer on its own
+            self.s3_client = get_client('s3', region=region, profile_name=profile_name,
+                                        max_pool_connections=max_pool_connections, endpoint_url=endpoint_url,
+                                        retries={'mode': 'adaptive', 'max_attempts': self.limiter.max_attempts})
+            # Requests made through the limiter are sent once; the limiter alone decides on retries,
+            # so it sees every throttle as it happens instead of after botocore gives up
+            self._request_client = get_client('s3', region=region, profile_name=profile_name,
+                                              max_pool_connections=max_pool_connections, endpoint_url=endpoint_url,
+                                              retries={'total_max_attempts': 1})
+            events = self.s3_client.meta.events
+            events.register('before-parameter-build.s3', _tag_transfer_request, unique_id='s3manager-transfer-object')
+            events.register('after-call.s3', _count_transfer_retries, unique_id='s3manager-transfer-retries')
+            events.register('after-call-error.s3', _count_transfer_retries, unique_id='s3manager-transfer-errors')
         except Exception as e:
             print(f"Failed to initialize S3 client: {e}")
             sys.exit(1)
 
+    @property
+    def s3_resource(self):
+        """
+        boto3 S3 resource, created on first use. Resources are not thread-safe, so each manager has its own.
+        """
+        if self._s3_resource is None:
+            session = get_session(self.profile_name, self.region)
+            # Sessions are not thread-safe, so resources are built under the same lock as clients
+            with _cache_lock:
+                if self._s3_resource is None:
+                    self._s3_resource = session.resource('s3', endpoint_url=self.endpoint_url)
+        return self._s3_resource
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Close the trace file opened for trace_path. The shared client stays open for other managers.
+        """
+        if self._trace:
+            self.metrics_hooks.remove(self._trace)
+            self._trace.close()
+            self._trace = None
+
+    def _mark_failed(self):
+        # For methods whose error result ([] from a listing) looks like a successful one
+        self._local.failed = True
+
+    def _emit(self, event):
+        event['ts'] = time.time()
+        for hook in self.metrics_hooks:
+            try:
+                hook(event)
+            except Exception as e:
+                print(f"Metrics hook {hook!r} failed: {e}")
+
+    def _call(self, fn, *args, **kwargs):
+        """
+        Make one S3 request through the adaptive limiter and report it to the metrics hooks.
+
+        fn must be a method of self._request_client, which never retries on its own.
+        """
+        return self._limited(self.limiter.call, fn, args, kwargs)
+
+    def _transfer(self, fn, **kwargs):
+        """
+        Run a managed transfer (client upload_file or download_file) in one limiter slot.
+
+        The transfer is not retried as a whole, so a throttled part never restarts the file or
+        counts its bytes twice in a progress callback. Bucket and Key must be passed by name, so
+        botocore's retries of the transfer's parts can be credited to it.
+        """
+        key = (kwargs['Bucket'], kwargs['Key'])
+        watcher = {'retries': 0, 'limiter': self.limiter}
+        with _transfers_lock:
+            _transfers[key] = watcher
+        try:
+            return self._limited(self.limiter.attempt, fn, (), kwargs, watcher)
+        finally:
+            with _transfers_lock:
+                if _transfers.get(key) is watcher:
+                    del _transfers[key]
+
+    def _limited(self, run, fn, args, kwargs, watcher=None):
+        if not self.metrics_hooks:
+            return run(fn, *args, **kwargs)
+        attempts = []
+
+        def attempt(*args, **kwargs):
+            attempts.append(self.limiter.in_flight)
+            return fn(*args, **kwargs)
+
+        started = time.monotonic()
+        result = None
+        error = None
+        try:
+            result = run(attempt, *args, **kwargs)
+            return result
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # Limiter-level attempts, plus whatever botocore retried underneath
+            response = result if error is None else getattr(error, 'response', None)
+            retries = max(0, len(attempts) - 1) + (watcher['retries'] if watcher else 0)
+            if isinstance(response, dict):
+                retries += response.get('ResponseMetadata', {}).get('RetryAttempts', 0)
+            self._emit({'kind': 'request', 'op': fn.__name__, 'seconds': time.monotonic() - started,
+                        'bytes': request_bytes(fn.__name__, args, kwargs, result) if error is None else 0,
+                        'retries': retries, 'concurrency': max(attempts, default=0),
+                        'limit': self.limiter.limit, 'ok': error is None, 'error': repr(error) if error else None})
+
+    @instrumented
     def create_bucket(self, bucket_name, region=None):
         """
         Create an S3 bucket in a specified region.
@@ -48,6 +884,7 @@ class S3Manager:
             print(f"Error: {e}")
             return False
 
+    @instrumented
     def list_buckets(self):
         """
         List all S3 buckets in the account.
@@ -64,19 +901,24 @@ class S3Manager:
         except ClientError as e:
             print(f"Failed to list buckets.")
             print(f"Error: {e}")
+            self._mark_failed()
             return []
 
-    def delete_bucket(self, bucket_name):
+    @instrumented
+    def delete_bucket(self, bucket_name, max_workers=8):
         """
-        Delete an S3 bucket. The bucket must be empty before deletion.
+        Delete an S3 bucket together with all its objects, object versions and delete markers.
 
         :param bucket_name: Name of the bucket to delete
+        :param max_workers: Number of DeleteObjects batches sent at the same time
         :return: True if deleted, else False
         """
         try:
-            bucket = self.s3_resource.Bucket(bucket_name)
             # Ensure the bucket is empty
-            bucket.objects.all().delete()
+            report = self.delete_prefix(bucket_name, versions=True, max_workers=max_workers)
+            if report['failed']:
+                print(f"Failed to delete bucket '{bucket_name}': {report['failed']} object(s) could not be deleted.")
+                return False
             self.s3_client.delete_bucket(Bucket=bucket_name)
             print(f"Bucket '{bucket_name}' deleted successfully.")
             return True
@@ -85,39 +927,201 @@ class S3Manager:
             print(f"Error: {e}")
             return False
 
-    def upload_file(self, file_path, bucket_name, object_name=None):
+    @instrumented
+    def upload_file(self, file_path, bucket_name, object_name=None, config=None, callback=None, extra_args=None):
         """
         Upload a file to an S3 bucket.
 
         :param file_path: Path to the file to upload
         :param bucket_name: Name of the target bucket
         :param object_name: S3 object name. If not specified, file_path's basename is used
+        :param config: Optional boto3 TransferConfig controlling multipart threshold and chunk size
+        :param callback: Optional callable receiving the number of bytes sent for each chunk
+        :param extra_args: Optional dict of extra upload arguments, e.g. ContentType or Metadata
         :return: True if file is uploaded, else False
         """
         if object_name is None:
             object_name = os.path.basename(file_path)
         try:
-            self.s3_client.upload_file(file_path, bucket_name, object_name)
+            self._transfer(self.s3_client.upload_file, Filename=file_path, Bucket=bucket_name, Key=object_name,
+                           ExtraArgs=extra_args, Config=config, Callback=callback)
             print(f"File '{file_path}' uploaded to bucket '{bucket_name}' as '{object_name}'.")
             return True
-        except ClientError as e:
+        except (ClientError, S3UploadFailedError) as e:
             print(f"Failed to upload file '{file_path}' to bucket '{bucket_name}'.")
             print(f"Error: {e}")
             return False
 
-    def download_file(self, bucket_name, object_name, file_path=None):
+    @instrumented
+    def upload_stream(self, source, bucket_name, object_name, part_size=8 * MB, max_workers=4,
+                      callback=None, extra_args=None):
+        """
+        Upload a file-like object, bytes buffer or iterator of chunks without a local copy.
+
+        The source is read one part at a time and sent as a multipart upload with at most
+        ``max_workers`` parts in flight, so memory use stays below roughly
+        ``(max_workers + 1) * part_size`` regardless of the stream length. Sources smaller
+        than one part are sent with a single PutObject. S3 allows 10,000 parts, so
+        ``part_size`` caps the object size (8 MB parts: ~78 GB).
+
+        :param source: bytes-like object, file-like object with read(), or iterable of bytes/str chunks
+        :param bucket_name: Name of the target bucket
+        :param object_name: S3 object name
+        :param part_size: Size in bytes of each part, at least 5 MB
+        :param max_workers: Number of parts uploaded at the same time
+        :param callback: Optional callable receiving the number of bytes sent for each part
+        :param extra_args: Optional dict of extra PutObject/CreateMultipartUpload arguments, e.g. ContentType
+        :return: True if the stream is uploaded, else False
+        """
+        part_size = max(part_size, 5 * MB)
+        extra_args = extra_args or {}
+        parts = iter_parts(source, part_size)
+        upload_id = None
+        try:
+            first = next(parts, b'')
+            if len(first) < part_size:
+                self._call(self._request_client.put_object, Bucket=bucket_name, Key=object_name, Body=first,
+                           **extra_args)
+                if callback:
+                    callback(len(first))
+            else:
+                upload_id = self.s3_client.create_multipart_upload(
+                    Bucket=bucket_name, Key=object_name, **extra_args)['UploadId']
+
+                def numbered_parts():
+                    yield 1, first
+                    for number, data in enumerate(parts, start=2):
+                        yield number, data
+
+                def upload_part(part):
+                    number, data = part
+                    response = self._call(self._request_client.upload_part, Bucket=bucket_name, Key=object_name,
+                                          UploadId=upload_id, PartNumber=number, Body=data)
+                    if callback:
+                        callback(len(data))
+                    return {'PartNumber': number, 'ETag': response['ETag']}
+
+                completed = list(bounded_map(upload_part, numbered_parts(), max_workers=max_workers,
+                                             max_pending=max_workers))
+                self.s3_client.complete_multipart_upload(
+                    Bucket=bucket_name, Key=object_name, UploadId=upload_id,
+                    MultipartUpload={'Parts': sorted(completed, key=lambda part: part['PartNumber'])}
+                )
+            print(f"Stream uploaded to bucket '{bucket_name}' as '{object_name}'.")
+            return True
+        except Exception as e:
+            # The producer can fail with anything; never leave an orphaned multipart upload behind
+            if upload_id:
+                try:
+                    self.s3_client.abort_multipart_upload(Bucket=bucket_name, Key=object_name, UploadId=upload_id)
+                except ClientError:
+                    pass
+            print(f"Failed to upload stream to bucket '{bucket_name}' as '{object_name}'.")
+            print(f"Error: {e}")
+            return False
+
+    @instrumented
+    def upload_compressed(self, source, bucket_name, object_name=None, encoding='gzip', level=None, threads=None,
+                          part_size=8 * MB, content_type=None):
+        """
+        Compress a file or stream on the fly and upload it with the matching Content-Encoding.
+
+        Nothing is written to disk: the source is compressed chunk by chunk and streamed into
+        upload_stream. The original size (when known) is stored in the
+        ``uncompressed-size`` metadata field. Pair with download_decompressed.
+
+        :param source: Path to a file, or anything upload_stream accepts
+        :param bucket_name: Name of the target bucket
+        :param object_name: S3 object name. If not specified, the file's basename is used; required for streams
+        :param encoding: 'gzip' or 'zstd'
+        :param level: Compression level. Defaults to 6 for gzip and 3 for zstd
+        :param threads: Compression threads. Defaults to all CPUs for sources above 64 MB, else 1
+        :param part_size: Size in bytes of each uploaded part
+        :param content_type: Content-Type of the uncompressed data. Guessed from the name if not given
+        :return: True if uploaded, else False
+        """
+        metadata = {}
+        stream = None
+        try:
+            if isinstance(source, (str, os.PathLike)):
+                object_name = object_name or os.path.basename(source)
+                size = os.path.getsize(source)
+                metadata['uncompressed-size'] = str(size)
+                stream = source = open(source, 'rb')
+            elif isinstance(source, (bytes, bytearray, memoryview)):
+                size = len(source)
+                metadata['uncompressed-size'] = str(size)
+            else:
+                size = None
+            if object_name is None:
+                raise ValueError("object_name is required when the source is not a file path")
+            if threads is None:
+                threads = (os.cpu_count() or 1) if size is not None and size > 64 * MB else 1
+            content_type = content_type or mimetypes.guess_type(object_name)[0] or 'application/octet-stream'
+            extra_args = {'ContentEncoding': encoding, 'ContentType': content_type, 'Metadata': metadata}
+            compressed = compress_chunks(iter_parts(source, MB), encoding, level, threads)
+            return self.upload_stream(compressed, bucket_name, object_name, part_size=part_size,
+                                      extra_args=extra_args)
+        except (OSError, ValueError) as e:
+            print(f"Failed to upload compressed object '{object_name}' to bucket '{bucket_name}'.")
+            print(f"Error: {e}")
+            return False
+        finally:
+            if stream:
+                stream.close()
+
+    @instrumented
+    def download_decompressed(self, bucket_name, object_name, file_path=None):
+        """
+        Download an object, transparently decompressing gzip or zstd Content-Encoding.
+
+        Objects without a Content-Encoding are written as is.
+
+        :param bucket_name: Name of the bucket
+        :param object_name: S3 object name to download
+        :param file_path: Path to save the decompressed file. If not specified, uses object_name
+        :return: True if file is downloaded, else False
+        """
+        if file_path is None:
+            file_path = object_name
+        part_path = f"{file_path}.part"
+        try:
+            response = self._call(self._request_client.get_object, Bucket=bucket_name, Key=object_name)
+            encoding = response.get('ContentEncoding')
+            chunks = response['Body'].iter_chunks(chunk_size=MB)
+            if encoding in ('gzip', 'zstd'):
+                chunks = decompress_chunks(chunks, encoding)
+            # Written next to the target and renamed only when complete, so a failure leaves no partial file
+            with open(part_path, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(part_path, file_path)
+            print(f"Object '{object_name}' from bucket '{bucket_name}' downloaded to '{file_path}'.")
+            return True
+        except (ClientError, BotoCoreError, OSError, ValueError, zlib.error, ZstdError) as e:
+            print(f"Failed to download object '{object_name}' from bucket '{bucket_name}'.")
+            print(f"Error: {e}")
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            return False
+
+    @instrumented
+    def download_file(self, bucket_name, object_name, file_path=None, config=None, callback=None):
         """
         Download a file from an S3 bucket.
 
         :param bucket_name: Name of the bucket
         :param object_name: S3 object name to download
         :param file_path: Path to save the downloaded file. If not specified, uses object_name
+        :param config: Optional boto3 TransferConfig controlling ranged download chunk size and concurrency
+        :param callback: Optional callable receiving the number of bytes received for each chunk
         :return: True if file is downloaded, else False
         """
         if file_path is None:
             file_path = object_name
         try:
-            self.s3_client.download_file(bucket_name, object_name, file_path)
+            self._transfer(self.s3_client.download_file, Bucket=bucket_name, Key=object_name, Filename=file_path,
+                           Config=config, Callback=callback)
             print(f"Object '{object_name}' from bucket '{bucket_name}' downloaded to '{file_path}'.")
             return True
         except ClientError as e:
@@ -125,56 +1129,552 @@ class S3Manager:
             print(f"Error: {e}")
             return False
 
+    @instrumented
+    def download_file_ranged(self, bucket_name, object_name, file_path=None, chunksize=16 * MB,
+                             max_workers=8, callback=None):
+        """
+        Download a large object as concurrent byte-range GETs written into a preallocated file.
+
+        Data is written to ``<file_path>.part`` with positional writes, and the completed
+        ranges are recorded in ``<file_path>.part.json``. If a download is interrupted,
+        calling this again with the same chunk size skips the ranges already on disk, as long
+        as the object's ETag has not changed. The part file is renamed into place at the end.
+
+        :param bucket_name: Name of the bucket
+        :param object_name: S3 object name to download
+        :param file_path: Path to save the downloaded file. If not specified, uses object_name
+        :param chunksize: Size in bytes of each ranged GET
+        :param max_workers: Number of ranges fetched at the same time
+        :param callback: Optional callable receiving the number of bytes written for each chunk
+        :return: True if file is downloaded, else False
+        """
+        if file_path is None:
+            file_path = object_name
+        part_path = f"{file_path}.part"
+        state_path = f"{file_path}.part.json"
+        try:
+            head = self._call(self._request_client.head_object, Bucket=bucket_name, Key=object_name)
+            size = head['ContentLength']
+            etag = head['ETag']
+
+            state = load_manifest(state_path)
+            if state.get('etag') != etag or state.get('size') != size or state.get('chunksize') != chunksize \
+                    or not os.path.exists(part_path):
+                state = {'etag': etag, 'size': size, 'chunksize': chunksize, 'done': []}
+            done = set(state['done'])
+            ranges = [i for i in range((size + chunksize - 1) // chunksize) if i not in done]
+            if done:
+                print(f"Resuming download of '{object_name}': {len(done)} range(s) already on disk.")
+
+            directory = os.path.dirname(file_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            lock = threading.Lock()
+            fd = os.open(part_path, os.O_RDWR | os.O_CREAT)
+            try:
+                os.ftruncate(fd, size)
+
+                def fetch(index):
+                    start = index * chunksize
+                    end = min(start + chunksize, size) - 1
+                    response = self._call(self._request_client.get_object, Bucket=bucket_name, Key=object_name,
+                                          Range=f"bytes={start}-{end}", IfMatch=etag)
+                    offset = start
+                    for chunk in response['Body'].iter_chunks(chunk_size=MB):
+                        os.pwrite(fd, chunk, offset)
+                        offset += len(chunk)
+                        if callback:
+                            callback(len(chunk))
+                    if offset != end + 1:
+                        raise IOError(f"Short read for bytes {start}-{end} of '{object_name}'")
+                    with lock:
+                        done.add(index)
+                        state['done'] = sorted(done)
+                        save_manifest(state_path, state)
+
+                executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+                try:
+                    for future in as_completed([executor.submit(fetch, index) for index in ranges]):
+                        future.result()
+                finally:
+                    # Stop scheduling new ranges as soon as one fails; the rest resume later
+                    executor.shutdown(wait=True, cancel_futures=True)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+            os.replace(part_path, file_path)
+            if os.path.exists(state_path):
+                os.remove(state_path)
+            print(f"Object '{object_name}' from bucket '{bucket_name}' downloaded to '{file_path}'.")
+            return True
+        except (ClientError, OSError) as e:
+            print(f"Failed to download object '{object_name}' from bucket '{bucket_name}'.")
+            print(f"Error: {e}")
+            return False
+
+    @instrumented
     def list_objects(self, bucket_name, prefix=None):
         """
         List objects in an S3 bucket.
 
+        Follows continuation tokens, so buckets with more than 1,000 keys are listed in full.
+        Use iter_objects to walk large buckets without holding every key in memory.
+
         :param bucket_name: Name of the bucket
         :param prefix: Filter objects with this prefix
         :return: List of object keys
         """
         try:
-            if prefix:
-                response = self.s3_client.list_objects_v2(Bucket=bucket_name, Prefix=prefix)
-            else:
-                response = self.s3_client.list_objects_v2(Bucket=bucket_name)
-            objects = [obj['Key'] for obj in response.get('Contents', [])] if 'Contents' in response else []
-            if objects:
-                print(f"Objects in bucket '{bucket_name}':")
-                for obj in objects:
-                    print(f" - {obj}")
-            else:
+            objects = []
+            for obj in self.iter_objects(bucket_name, prefix=prefix):
+                if not objects:
+                    print(f"Objects in bucket '{bucket_name}':")
+                print(f" - {obj['Key']}")
+                objects.append(obj['Key'])
+            if not objects:
                 print(f"No objects found in bucket '{bucket_name}'.")
             return objects
         except ClientError as e:
             print(f"Failed to list objects in bucket '{bucket_name}'.")
             print(f"Error: {e}")
+            self._mark_failed()
             return []
 
-    def delete_object(self, bucket_name, object_name):
+    def _iter_pages(self, bucket_name, prefix=None, delimiter=None, page_size=1000):
+        """
+        Yield raw ListObjectsV2 pages, following continuation tokens.
+        """
+        kwargs = {'Bucket': bucket_name, 'Prefix': prefix or '', 'PaginationConfig': {'PageSize': page_size}}
+        if delimiter:
+            kwargs['Delimiter'] = delimiter
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        yield from paginator.paginate(**kwargs)
+
+    def iter_objects(self, bucket_name, prefix=None, delimiter=None, page_size=1000):
+        """
+        Lazily yield object metadata, one page of keys in memory at a time.
+
+        With a delimiter, only the objects directly under the prefix are yielded; use
+        iter_prefixes to get the "sub-directories" at the same level.
+
+        :param bucket_name: Name of the bucket
+        :param prefix: Filter objects with this prefix
+        :param delimiter: Group keys on this character, e.g. '/'
+        :param page_size: Number of keys requested per ListObjectsV2 call (max 1,000)
+        :return: Generator of dicts with Key, Size, ETag, LastModified and StorageClass
+        :raises ClientError: If a listing call fails
+        """
+        for page in self._iter_pages(bucket_name, prefix, delimiter, page_size):
+            yield from page.get('Contents', [])
+
+    def iter_prefixes(self, bucket_name, prefix=None, delimiter='/'):
+        """
+        Lazily yield the common prefixes ("directories") directly under a prefix.
+
+        :param bucket_name: Name of the bucket
+        :param prefix: Parent prefix, e.g. 'images/'
+        :param delimiter: Character separating key levels
+        :return: Generator of prefix strings
+        :raises ClientError: If a listing call fails
+        """
+        for page in self._iter_pages(bucket_name, prefix, delimiter):
+            for common_prefix in page.get('CommonPrefixes', []):
+                yield common_prefix['Prefix']
+
+    def iter_objects_parallel(self, bucket_name, prefixes=None, max_workers=8, delimiter='/', max_pending_pages=32):
+        """
+        List several prefixes concurrently and yield their objects as pages arrive.
+
+        If no prefixes are given, the top level of the bucket is split on the delimiter and
+        each "directory" is listed by its own worker, while top-level objects are listed
+        inline. At most ``max_pending_pages`` pages are buffered, so memory stays bounded
+        even when the consumer is slower than the listing. Objects are not yielded in key order.
+
+        :param bucket_name: Name of the bucket
+        :param prefixes: Disjoint prefixes to list. If None, discovered from the bucket's top level
+        :param max_workers: Number of prefixes listed at the same time
+        :param delimiter: Delimiter used to discover top-level prefixes
+        :param max_pending_pages: Maximum number of listed pages waiting to be consumed
+        :return: Generator of object metadata dicts, as yielded by iter_objects
+        :raises ClientError: If a listing call fails
+        """
+        if prefixes is None:
+            prefixes = []
+            for page in self._iter_pages(bucket_name, delimiter=delimiter):
+                yield from page.get('Contents', [])
+                prefixes.extend(p['Prefix'] for p in page.get('CommonPrefixes', []))
+        if not prefixes:
+            return
+
+        pages = queue.Queue(maxsize=max_pending_pages)
+        done = object()
+        stop = threading.Event()
+
+        def list_prefix(prefix):
+            try:
+                for page in self._iter_pages(bucket_name, prefix):
+                    if stop.is_set():
+                        break
+                    pages.put(page.get('Contents', []))
+            except Exception as e:
+                pages.put(e)
+            finally:
+                pages.put(done)
+
+        executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+        futures = [executor.submit(list_prefix, prefix) for prefix in prefixes]
+        try:
+            remaining = len(futures)
+            while remaining:
+                item = pages.get()
+                if item is done:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield from item
+        finally:
+            # The consumer may stop early: cancel queued prefixes and drain the queue so
+            # workers blocked on a full queue can exit
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            while not all(future.done() for future in futures):
+                try:
+                    pages.get(timeout=0.05)
+                except queue.Empty:
+                    pass
+
+    def _copy(self, source_bucket, source_key, bucket_name, object_name, size=None,
+              part_size=512 * MB, part_workers=8, if_match=None):
+        """
+        Copy one object server-side, switching to multipart UploadPartCopy above 5 GB.
+
+        With ``if_match``, the copy fails with a 412 ClientError unless the source ETag matches.
+
+        :return: ETag of the new object
+        """
+        copy_source = {'Bucket': source_bucket, 'Key': source_key}
+        head = None
+        if size is None:
+            head = self._call(self._request_client.head_object, Bucket=source_bucket, Key=source_key)
+            size = head['ContentLength']
+        if size <= MAX_COPY_OBJECT_SIZE:
+            conditions = {'CopySourceIfMatch': if_match} if if_match else {}
+            response = self._call(self._request_client.copy_object, CopySource=copy_source, Bucket=bucket_name,
+                                  Key=object_name, **conditions)
+            return response['CopyObjectResult']['ETag']
+
+        head = head or self._call(self._request_client.head_object, Bucket=source_bucket, Key=source_key)
+        if if_match and head['ETag'].strip('"') != if_match.strip('"'):
+            raise ClientError({'Error': {'Code': 'PreconditionFailed', 'Message': 'Source ETag changed'}},
+                              'UploadPartCopy')
+        extra_args = {name: head[name] for name in ('ContentType', 'ContentEncoding', 'CacheControl', 'Metadata')
+                      if head.get(name)}
+        upload_id = self.s3_client.create_multipart_upload(Bucket=bucket_name, Key=object_name,
+                                                           **extra_args)['UploadId']
+
+        def copy_part(number):
+            start = (number - 1) * part_size
+            end = min(start + part_size, size) - 1
+            response = self._call(
+                self._request_client.upload_part_copy,
+                Bucket=bucket_name, Key=object_name, UploadId=upload_id, PartNumber=number,
+                CopySource=copy_source, CopySourceRange=f"bytes={start}-{end}",
+                CopySourceIfMatch=head['ETag']
+            )
+            return {'PartNumber': number, 'ETag': response['CopyPartResult']['ETag']}
+
+        try:
+            parts = list(bounded_map(copy_part, range(1, (size + part_size - 1) // part_size + 1),
+                                     max_workers=part_workers))
+            response = self.s3_client.complete_multipart_upload(
+                Bucket=bucket_name, Key=object_name, UploadId=upload_id,
+                MultipartUpload={'Parts': sorted(parts, key=lambda part: part['PartNumber'])}
+            )
+            return response['ETag']
+        except Exception:
+            self.s3_client.abort_multipart_upload(Bucket=bucket_name, Key=object_name, UploadId=upload_id)
+            raise
+
+    @instrumented
+    def copy_object(self, source_bucket, source_key, bucket_name, object_name, part_size=512 * MB, part_workers=8):
+        """
+        Copy an object server-side, without moving its bytes through this host.
+
+        Objects up to 5 GB use a single CopyObject; larger objects are copied as concurrent
+        UploadPartCopy ranges of ``part_size`` bytes.
+
+        :param source_bucket: Name of the source bucket
+        :param source_key: Key of the object to copy
+        :param bucket_name: Name of the target bucket
+        :param object_name: Target S3 object name
+        :param part_size: Size in bytes of each copied part for objects above 5 GB
+        :param part_workers: Number of parts copied at the same time
+        :return: True if copied, else False
+        """
+        try:
+            self._copy(source_bucket, source_key, bucket_name, object_name,
+                       part_size=part_size, part_workers=part_workers)
+            print(f"Object '{source_bucket}/{source_key}' copied to '{bucket_name}/{object_name}'.")
+            return True
+        except ClientError as e:
+            print(f"Failed to copy object '{source_bucket}/{source_key}' to '{bucket_name}/{object_name}'.")
+            print(f"Error: {e}")
+            return False
+
+    @instrumented
+    def move_object(self, source_bucket, source_key, bucket_name, object_name, part_size=512 * MB, part_workers=8):
+        """
+        Move or rename an object server-side: copy it, then delete the source.
+
+        :param source_bucket: Name of the source bucket
+        :param source_key: Key of the object to move
+        :param bucket_name: Name of the target bucket
+        :param object_name: Target S3 object name
+        :param part_size: Size in bytes of each copied part for objects above 5 GB
+        :param part_workers: Number of parts copied at the same time
+        :return: True if moved, else False
+        """
+        if (source_bucket, source_key) == (bucket_name, object_name):
+            return True
+        if not self.copy_object(source_bucket, source_key, bucket_name, object_name, part_size, part_workers):
+            return False
+        return self.delete_object(source_bucket, source_key)
+
+    @instrumented
+    def copy_prefix(self, source_bucket, source_prefix, bucket_name, target_prefix, move=False, max_workers=16):
+        """
+        Copy or move every object under a prefix server-side to another prefix or bucket.
+
+        The listing is streamed into a bounded copy pool. When moving, source keys are
+        deleted in DeleteObjects batches as soon as their copy has succeeded, so a failed
+        copy never loses the source object.
+
+        :param source_bucket: Name of the source bucket
+        :param source_prefix: Prefix of the keys to copy, e.g. 'step_2_'
+        :param bucket_name: Name of the target bucket
+        :param target_prefix: Prefix replacing source_prefix in the target keys
+        :param move: Delete each source object after it has been copied
+        :param max_workers: Number of objects copied at the same time
+        :return: True if every object is copied (and deleted when moving), else False
+        """
+        progress = TransferProgress()
+
+        def copy_one(obj):
+            key = obj['Key']
+            target_key = target_prefix + key[len(source_prefix):]
+            if (source_bucket, key) == (bucket_name, target_key):
+                return None
+            try:
+                self._copy(source_bucket, key, bucket_name, target_key, size=obj['Size'])
+                progress(obj['Size'])
+                progress.file_finished(True)
+                return key
+            except ClientError as e:
+                print(f"Failed to copy object '{source_bucket}/{key}' to '{bucket_name}/{target_key}'.")
+                print(f"Error: {e}")
+                progress.file_finished(False)
+                return None
+
+        try:
+            objects = self.iter_objects(source_bucket, prefix=source_prefix)
+            if bucket_name == source_bucket and target_prefix.startswith(source_prefix):
+                # Copies would show up in the listing being consumed, so snapshot it first
+                objects = list(objects)
+            copied = (key for key in bounded_map(copy_one, objects, max_workers=max_workers) if key)
+            failed_deletes = 0
+            if move:
+                failed_deletes = self.delete_objects(source_bucket, copied, max_workers=max(1, max_workers // 4))['failed']
+            else:
+                for _ in copied:
+                    pass
+        except ClientError as e:
+            print(f"Failed to copy prefix '{source_bucket}/{source_prefix}' to '{bucket_name}/{target_prefix}'.")
+            print(f"Error: {e}")
+            return False
+
+        report = progress.report()
+        action = 'Moved' if move else 'Copied'
+        print(f"{action} {report['files']} object(s), {report['bytes'] / MB:.2f} MB server-side in {report['seconds']}s.")
+        if report['failed'] or failed_deletes:
+            print(f"Failed to {'move' if move else 'copy'} {report['failed'] + failed_deletes} object(s) "
+                  f"from '{source_bucket}/{source_prefix}'.")
+            return False
+        return True
+
+    @instrumented
+    def delete_object(self, bucket_name, object_name, version_id=None):
         """
         Delete an object from an S3 bucket.
 
+        For many keys use delete_objects, which sends 1,000 keys per request.
+
         :param bucket_name: Name of the bucket
         :param object_name: S3 object name to delete
+        :param version_id: Delete this specific version instead of adding a delete marker
         :return: True if deleted, else False
         """
         try:
-            self.s3_client.delete_object(Bucket=bucket_name, Key=object_name)
+            if version_id:
+                self.s3_client.delete_object(Bucket=bucket_name, Key=object_name, VersionId=version_id)
+            else:
+                self.s3_client.delete_object(Bucket=bucket_name, Key=object_name)
             print(f"Object '{object_name}' deleted from bucket '{bucket_name}'.")
             return True
         except ClientError as e:
             print(f"Failed to delete object '{object_name}' from bucket '{bucket_name}'.")
             print(f"Error: {e}")
             return False
-        
-    def sync_folder(self, folder_path, bucket_name, s3_folder=None):
+
+    @instrumented
+    def delete_objects(self, bucket_name, objects, max_workers=8, batch_size=1000):
+        """
+        Delete many objects with concurrent DeleteObjects batches.
+
+        The input is consumed lazily and at most ``2 * max_workers`` batches are held in
+        memory, so a listing generator can be passed straight in.
+
+        :param bucket_name: Name of the bucket
+        :param objects: Iterable of keys, (key, version_id) tuples or {'Key', 'VersionId'} dicts
+        :param max_workers: Number of batches sent at the same time
+        :param batch_size: Keys per DeleteObjects request (S3 allows at most 1,000)
+        :return: Dict with deleted/failed counts, per-key errors and elapsed seconds
+        """
+        started = time.monotonic()
+        report = {'deleted': 0, 'failed': 0, 'errors': []}
+        lock = threading.Lock()
+
+        def delete_batch(batch):
+            deleted, errors = 0, []
+            for attempt in range(self.limiter.max_attempts):
+                try:
+                    response = self._call(self._request_client.delete_objects, Bucket=bucket_name,
+                                          Delete={'Objects': batch, 'Quiet': True})
+                    batch_errors = response.get('Errors', [])
+                except ClientError as e:
+                    error = e.response.get('Error', {})
+                    batch_errors = [dict(obj, Code=error.get('Code'), Message=error.get('Message', str(e)))
+                                    for obj in batch]
+                    errors.extend(batch_errors)
+                    break
+                deleted += len(batch) - len(batch_errors)
+                throttled = [error for error in batch_errors if error.get('Code') in THROTTLE_CODES]
+                errors.extend(error for error in batch_errors if error.get('Code') not in THROTTLE_CODES)
+                if not throttled:
+                    break
+                if attempt == self.limiter.max_attempts - 1:
+                    errors.extend(throttled)
+                    break
+                # Retry only the keys S3 asked us to slow down on
+                self.limiter.on_throttle()
+                self.limiter.backoff(attempt)
+                batch = [{name: error[name] for name in ('Key', 'VersionId') if error.get(name)} for error in throttled]
+            with lock:
+                report['deleted'] += deleted
+                report['failed'] += len(errors)
+                report['errors'].extend(errors)
+            for error in errors:
+                print(f"Failed to delete object '{error['Key']}' from bucket '{bucket_name}': {error.get('Message')}")
+
+        def batches():
+            batch = []
+            for obj in objects:
+                if isinstance(obj, str):
+                    obj = {'Key': obj}
+                elif isinstance(obj, tuple):
+                    obj = {'Key': obj[0], 'VersionId': obj[1]} if obj[1] else {'Key': obj[0]}
+                batch.append(obj)
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+        for _ in bounded_map(delete_batch, batches(), max_workers=max_workers):
+            pass
+
+        report['seconds'] = round(time.monotonic() - started, 3)
+        print(f"Deleted {report['deleted']} object(s) from bucket '{bucket_name}' in {report['seconds']}s, "
+              f"{report['failed']} failed.")
+        return report
+
+    def iter_object_versions(self, bucket_name, prefix=None):
+        """
+        Lazily yield every object version and delete marker under a prefix.
+
+        :param bucket_name: Name of the bucket
+        :param prefix: Filter versions with this prefix
+        :return: Generator of (key, version_id) tuples
+        :raises ClientError: If a listing call fails
+        """
+        paginator = self.s3_client.get_paginator('list_object_versions')
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix or ''):
+            for version in page.get('Versions', []) + page.get('DeleteMarkers', []):
+                yield version['Key'], version['VersionId']
+
+    @instrumented
+    def delete_prefix(self, bucket_name, prefix=None, versions=False, max_workers=8):
+        """
+        Delete every object under a prefix, streaming the listing into delete_objects.
+
+        :param bucket_name: Name of the bucket
+        :param prefix: Key prefix to delete. If None, the whole bucket is emptied
+        :param versions: Also delete all object versions and delete markers
+        :param max_workers: Number of DeleteObjects batches sent at the same time
+        :return: Dict report as returned by delete_objects
+        :raises ClientError: If listing the bucket fails
+        """
+        if versions:
+            objects = self.iter_object_versions(bucket_name, prefix)
+        else:
+            objects = (obj['Key'] for obj in self.iter_objects(bucket_name, prefix=prefix))
+        return self.delete_objects(bucket_name, objects, max_workers=max_workers)
+
+    def _remote_inventory(self, bucket_name, prefix):
+        """
+        Map every key under a prefix to its size and ETag using a single paginated listing.
+
+        :param bucket_name: Name of the bucket
+        :param prefix: Key prefix to list
+        :return: Dict of key -> (size, etag)
+        """
+        return {obj['Key']: (obj['Size'], obj['ETag'].strip('"'))
+                for obj in self.iter_objects(bucket_name, prefix=prefix)}
+
+    @instrumented
+    def sync_folder(self, folder_path, bucket_name, s3_folder=None, max_workers=8,
+                    multipart_threshold=8 * MB, multipart_chunksize=8 * MB, part_concurrency=4,
+                    delta=False, delete=False, manifest_path=None, dedup=False, index_path=None):
         """
         Synchronize a local folder with an S3 bucket.
 
+        Files are uploaded concurrently by a pool of ``max_workers`` threads. Each file larger
+        than ``multipart_threshold`` is sent as a multipart upload of ``multipart_chunksize``
+        parts, with up to ``part_concurrency`` parts in flight, so many small files and a few
+        large ones both keep the link busy. A throughput summary is printed at the end.
+
+        With ``delta`` enabled, the target prefix is listed once and only files whose size or
+        ETag differ from the remote object are uploaded. Local ETags are cached in a manifest
+        keyed by size and mtime, so unchanged files are not re-hashed on the next run.
+
+        With ``dedup`` enabled, files are hashed in parallel and looked up in a local
+        content index (SHA-256 -> key and ETag, per bucket). Content that already lives in the
+        bucket is copied server-side instead of being uploaded again, and files repeated
+        within one run are uploaded once and copied for the other keys.
+
         :param folder_path: Path to the local folder to sync
         :param bucket_name: Name of the target S3 bucket
         :param s3_folder: S3 folder prefix. If not specified, uploads to the root of the bucket
+        :param max_workers: Number of files uploaded at the same time
+        :param multipart_threshold: File size in bytes above which multipart upload is used
+        :param multipart_chunksize: Size in bytes of each multipart part
+        :param part_concurrency: Number of parts of a single file uploaded at the same time
+        :param delta: Only upload files that are new or changed compared to the bucket
+        :param delete: With delta, also delete remote objects under the prefix that no longer exist locally
+        :param manifest_path: Path of the delta manifest. Defaults to a hidden file inside folder_path
+        :param dedup: Copy already uploaded content server-side instead of uploading it again
+        :param index_path: Path of the content index. Defaults to ~/.s3manager/<bucket_name>.index.json
         :return: True if synchronization is successful, else False
         """
         folder_path = Path(folder_path)
@@ -182,22 +1682,272 @@ class S3Manager:
             print(f"The provided folder path '{folder_path}' is not a directory or does not exist.")
             return False
 
+        manifest_path = Path(manifest_path) if manifest_path else folder_path / MANIFEST_NAME
+        prefix = f"{s3_folder.rstrip('/')}/" if s3_folder else ''
         try:
+            jobs = []
             for root, dirs, files in os.walk(folder_path):
                 for file in files:
                     local_file_path = Path(root) / file
+                    if local_file_path == manifest_path:
+                        continue
                     relative_path = local_file_path.relative_to(folder_path)
-                    s3_key = str(relative_path).replace(os.sep, '/')
-                    if s3_folder:
-                        s3_key = f"{s3_folder.rstrip('/')}/{s3_key}"
-                    self.upload_file(str(local_file_path), bucket_name, object_name=s3_key)
+                    s3_key = prefix + str(relative_path).replace(os.sep, '/')
+                    jobs.append((str(local_file_path), s3_key))
+
+            if delta:
+                jobs = self._changed_files(jobs, bucket_name, prefix, manifest_path, delete,
+                                           max_workers, multipart_threshold, multipart_chunksize)
+                if jobs is None:
+                    return False
+
+            jobs = interleave_by_prefix(jobs, key=lambda job: job[1], depth=prefix.count('/') + 1)
+            progress = TransferProgress(total_files=len(jobs),
+                                        total_bytes=sum(os.path.getsize(path) for path, _ in jobs))
+            config = TransferConfig(multipart_threshold=multipart_threshold,
+                                    multipart_chunksize=multipart_chunksize,
+                                    max_concurrency=part_concurrency,
+                                    use_threads=part_concurrency > 1)
+
+            deduplicated = 0
+            if dedup:
+                index_path = Path(index_path) if index_path else CONTENT_INDEX_DIR / f"{bucket_name}.index.json"
+                deduplicated = self._sync_deduplicated(jobs, bucket_name, index_path, config, progress, max_workers)
+            else:
+                def upload(path, key):
+                    ok = self.upload_file(path, bucket_name, object_name=key, config=config, callback=progress)
+                    progress.file_finished(ok)
+                    return ok
+
+                for _ in bounded_map(lambda job: upload(*job), jobs, max_workers=max_workers):
+                    pass
+
+            report = progress.report()
+            print(f"Transferred {report['files']}/{report['total_files']} files, "
+                  f"{report['bytes'] / MB:.2f} MB in {report['seconds']}s ({report['mb_per_s']} MB/s)"
+                  + (f", {deduplicated} deduplicated server-side." if dedup else "."))
+            if report['failed']:
+                print(f"Failed to synchronize {report['failed']} file(s) from '{folder_path}' to bucket '{bucket_name}'.")
+                return False
             print(f"Folder '{folder_path}' synchronized to bucket '{bucket_name}' successfully.")
             return True
         except Exception as e:
             print(f"Failed to synchronize folder '{folder_path}' to bucket '{bucket_name}'.")
             print(f"Error: {e}")
-            return False    
+            return False
+
+    def _sync_deduplicated(self, jobs, bucket_name, index_path, config, progress, max_workers):
+        """
+        Upload sync jobs through the content index, copying known content server-side.
+
+        :return: Number of files that were copied or skipped instead of uploaded
+        """
+        index = load_manifest(index_path)
+        hashes = index.setdefault('hashes', {})
+        objects = index.setdefault('objects', {})
+        keys = index.setdefault('keys', {})
+        lock = threading.Lock()
+        saved = []
+
+        def digest(job):
+            path = os.path.abspath(job[0])
+            stat = os.stat(path)
+            cached = hashes.get(path)
+            if cached and cached[:2] == [stat.st_size, stat.st_mtime]:
+                return job, cached[2]
+            sha = compute_sha256(path)
+            with lock:
+                hashes[path] = [stat.st_size, stat.st_mtime, sha]
+            return job, sha
 
+        def upload(path, key, sha):
+            ok = self.upload_file(path, bucket_name, object_name=key, config=config, callback=progress,
+                                  extra_args={'Metadata': {'sha256': sha}})
+            if ok:
+                etag = self._call(self._request_client.head_object, Bucket=bucket_name, Key=key)['ETag']
+                with lock:
+                    objects[sha] = {'key': key, 'etag': etag}
+                    keys[key] = [sha, etag]
+            return ok
+
+        def place(job):
+            path, key, sha, source = job
+            current = keys.get(key)
+            if current and current[0] == sha:
+                try:
+                    # Same content already at this key: nothing to send
+                    self._call(self._request_client.head_object, Bucket=bucket_name, Key=key, IfMatch=current[1])
+                    saved.append(key)
+                    progress.file_finished(True)
+                    return True
+                except ClientError:
+                    pass
+            known = source or objects.get(sha)
+            if known and known['key'] != key:
+                try:
+                    etag = self._copy(bucket_name, known['key'], bucket_name, key, size=os.path.getsize(path),
+                                      if_match=known['etag'])
+                    with lock:
+                        keys[key] = [sha, etag]
+                    saved.append(key)
+                    progress.file_finished(True)
+                    return True
+                except ClientError:
+                    # The indexed object was changed or deleted; forget it and upload instead
+                    with lock:
+                        if objects.get(sha) == known:
+                            del objects[sha]
+            ok = upload(path, key, sha)
+            progress.file_finished(ok)
+            return ok
+
+        try:
+            digests = list(bounded_map(digest, jobs, max_workers=max_workers))
+            first, repeats, known = {}, [], []
+            for (path, key), sha in digests:
+                if sha in objects or keys.get(key, [None])[0] == sha:
+                    known.append((path, key, sha, None))
+                elif sha in first:
+                    repeats.append((path, key, sha))
+                else:
+                    first[sha] = (path, key, sha, None)
+            # Known content and first occurrences of new content go first; repeats then copy from
+            # whichever key their content was uploaded to
+            for _ in bounded_map(place, known + list(first.values()), max_workers=max_workers):
+                pass
+            for _ in bounded_map(place, [(path, key, sha, objects.get(sha)) for path, key, sha in repeats],
+                                 max_workers=max_workers):
+                pass
+        finally:
+            index_path.parent.mkdir(parents=True, exist_ok=True)
+            save_manifest(index_path, index)
+        return len(saved)
+
+    def _changed_files(self, jobs, bucket_name, prefix, manifest_path, delete,
+                       max_workers, multipart_threshold, multipart_chunksize):
+        """
+        Filter sync jobs down to files that differ from the bucket and refresh the manifest.
+
+        :return: List of (file_path, key) tuples to upload, or None if orphan deletion failed
+        """
+        manifest = load_manifest(manifest_path)
+        remote = self._remote_inventory(bucket_name, prefix)
+
+        def local_entry(path, key):
+            stat = os.stat(path)
+            cached = manifest.get(key)
+            if cached and cached['size'] == stat.st_size and cached['mtime'] == stat.st_mtime \
+                    and cached.get('parts') == [multipart_threshold, multipart_chunksize]:
+                return key, cached
+            return key, {'size': stat.st_size, 'mtime': stat.st_mtime,
+                         'parts': [multipart_threshold, multipart_chunksize],
+                         'etag': compute_etag(path, multipart_threshold, multipart_chunksize)}
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            entries = dict(executor.map(lambda job: local_entry(*job), jobs))
+        save_manifest(manifest_path, entries)
+
+        changed = [(path, key) for path, key in jobs
+                   if remote.get(key) != (entries[key]['size'], entries[key]['etag'])]
+        print(f"Delta sync: {len(changed)} of {len(jobs)} file(s) new or changed.")
+
+        if delete:
+            orphans = sorted(set(remote) - set(entries))
+            if orphans:
+                print(f"Deleting {len(orphans)} orphaned object(s) from bucket '{bucket_name}'.")
+                if self.delete_objects(bucket_name, orphans, max_workers=max_workers)['failed']:
+                    return None
+        return changed
+
+    @instrumented
+    def mirror_prefix(self, bucket_name, folder_path, prefix=None, max_workers=8,
+                      ranged_threshold=64 * MB, ranged_chunksize=16 * MB):
+        """
+        Mirror every object under a bucket prefix into a local folder.
+
+        The listing is streamed into a bounded download pool, keys keep their hierarchy below
+        ``prefix``, and files whose size and ETag already match the object are skipped. ETags
+        of local files are cached in the folder's sync manifest so unchanged files are not
+        re-hashed. Objects larger than ``ranged_threshold`` use download_file_ranged.
+
+        :param bucket_name: Name of the bucket
+        :param folder_path: Local folder to mirror into
+        :param prefix: Key prefix to mirror. If not specified, mirrors the whole bucket
+        :param max_workers: Number of objects downloaded at the same time
+        :param ranged_threshold: Object size in bytes above which ranged GETs are used
+        :param ranged_chunksize: Size in bytes of each ranged GET
+        :return: True if every object is mirrored, else False
+        """
+        folder_path = Path(folder_path)
+        prefix = prefix or ''
+        manifest_path = folder_path / MANIFEST_NAME
+        manifest = load_manifest(manifest_path)
+        lock = threading.Lock()
+        progress = TransferProgress()
+        skipped = 0
+
+        def is_current(path, key, size, etag):
+            if not path.is_file():
+                return False
+            stat = path.stat()
+            if stat.st_size != size:
+                return False
+            cached = manifest.get(key)
+            if cached and cached['size'] == size and cached['mtime'] == stat.st_mtime:
+                return cached['etag'] == etag
+            part_size = None
+            if '-' in etag:
+                part_size = self._call(self._request_client.head_object, Bucket=bucket_name, Key=key,
+                                       PartNumber=1)['ContentLength']
+            local_etag = compute_etag(str(path), *multipart_layout(size, etag, part_size))
+            with lock:
+                manifest[key] = {'size': size, 'mtime': stat.st_mtime, 'etag': local_etag}
+            return local_etag == etag
+
+        def mirror(obj):
+            key = obj['Key']
+            relative = key[len(prefix):].lstrip('/')
+            if not relative or key.endswith('/') or relative == MANIFEST_NAME:
+                return None
+            if '..' in Path(relative).parts:
+                print(f"Skipping object '{key}': key escapes the target folder.")
+                return None
+            path = folder_path / relative
+            etag = obj['ETag'].strip('"')
+            if is_current(path, key, obj['Size'], etag):
+                return None
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if obj['Size'] > ranged_threshold:
+                ok = self.download_file_ranged(bucket_name, key, str(path), chunksize=ranged_chunksize,
+                                               callback=progress)
+            else:
+                ok = self.download_file(bucket_name, key, str(path), callback=progress)
+            progress.file_finished(ok)
+            if ok:
+                with lock:
+                    manifest[key] = {'size': obj['Size'], 'mtime': path.stat().st_mtime, 'etag': etag}
+            return ok
+
+        try:
+            folder_path.mkdir(parents=True, exist_ok=True)
+            for ok in bounded_map(mirror, self.iter_objects(bucket_name, prefix=prefix), max_workers=max_workers):
+                if ok is None:
+                    skipped += 1
+        except (ClientError, OSError) as e:
+            print(f"Failed to mirror bucket '{bucket_name}' prefix '{prefix}' to '{folder_path}'.")
+            print(f"Error: {e}")
+            return False
+        finally:
+            save_manifest(manifest_path, manifest)
+
+        report = progress.report()
+        print(f"Downloaded {report['files']} file(s), {report['bytes'] / MB:.2f} MB in {report['seconds']}s "
+              f"({report['mb_per_s']} MB/s), {skipped} already up to date.")
+        if report['failed']:
+            print(f"Failed to mirror {report['failed']} object(s) from bucket '{bucket_name}'.")
+            return False
+        print(f"Bucket '{bucket_name}' prefix '{prefix}' mirrored to '{folder_path}' successfully.")
+        return True
 
 
 def main():
@@ -0,0 +1,189 @@
+"""
+Benchmark serial vs. concurrent provisioning of peering.py topologies against a mocked EC2.
+
+Every run builds the full VPC + mesh (or transit hub) flow inside moto's mock_aws (pip install
+moto), so no AWS account is needed. moto answers instantly, so an artificial latency is added
+to every EC2 call to make the difference between one call at a time and the thread pools show.
+
+    python benchmark.py
+    python benchmark.py --regions 5 15 --latency 0.1 --jitter 0.05 --json results.json
+    python benchmark.py --regions 30 --mode hub --strategy concurrent
+
+Each run is then torn down again. The benchmark stops and exits with status 1 if any link did
+not get routed or the teardown left tagged resources behind, so it doubles as a regression test.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import boto3
+from loguru import logger
+from moto import mock_aws
+
+import peering
+
+# name -> max_workers passed to peering.run; 1 makes every pool run a single call at a time
+STRATEGIES = {
+    'serial': 1,
+    'concurrent': 32,
+}
+
+
+class LatencyInjector:
+    """
+    Sleep before every EC2 call of a client, using botocore's event hooks.
+    """
+
+    def __init__(self, client, latency, jitter):
+        self.latency = latency
+        self.jitter = jitter
+        client.meta.events.register('before-call.ec2', self._before)
+
+    def _before(self, **kwargs):
+        time.sleep(self.latency + random.uniform(0, self.jitter))
+
+
+def benchmark_regions(count):
+    # Regions moto knows about, with the ones peering.py uses by default first
+    available = boto3.session.Session().get_available_regions('ec2')
+    regions = peering.common_regions + sorted(set(available) - set(peering.common_regions))
+    if count > len(regions):
+        raise ValueError(f"Only {len(regions)} EC2 regions are available, cannot build a {count} region topology")
+    return regions[:count]
+
+
+def leftover_resources(regions, topology):
+    # Tagged resources that still exist after a teardown, as "<region> <type> <id>" strings
+    tag_filter = [{'Name': 'tag:' + peering.TOPOLOGY_TAG, 'Values': [topology]}]
+    leftovers = []
+    for region_name in regions:
+        ec2 = peering.get_ec2_client(region_name)
+        for vpc in ec2.describe_vpcs(Filters=tag_filter)['Vpcs']:
+            leftovers.append(f"{region_name} vpc {vpc['VpcId']}")
+        for connection in ec2.describe_vpc_peering_connections(Filters=tag_filter)['VpcPeeringConnections']:
+            if connection['Status']['Code'] not in ('deleted', 'rejected', 'expired'):
+                leftovers.append(f"{region_name} peering {connection['VpcPeeringConnectionId']}")
+        for gateway in ec2.describe_transit_gateways(Filters=tag_filter)['TransitGateways']:
+            if gateway['State'] != 'deleted':
+                leftovers.append(f"{region_name} transit-gateway {gateway['TransitGatewayId']}")
+    return leftovers
+
+
+def run_benchmark(regions, mode, strategy, latency, jitter, poll_delay, workdir):
+    spec = dict(peering.default_topology, name=f"benchmark-{len(regions)}", mode=mode, regions=regions)
+    rundir = os.path.join(workdir, f"{mode}-{len(regions)}-{strategy}")
+    os.makedirs(rundir)
+    cwd = os.getcwd()
+    with mock_aws():
+        # Clients and pollers are cached per region; they must be created inside this mock
+        peering.ec2_clients.clear()
+        peering.pollers.clear()
+        for region_name in regions:
+            ec2 = peering.get_ec2_client(region_name)
+            LatencyInjector(ec2, latency, jitter)
+            peering.pollers[region_name] = peering.StatusPoller(ec2, min_delay=poll_delay)
+        try:
+            # provision() writes all_vpc.json to the working directory
+            os.chdir(rundir)
+            started = time.perf_counter()
+            peering.run(spec, state_path='state.json', profile_path='timeline.json',
+                        max_workers=STRATEGIES[strategy])
+            seconds = time.perf_counter() - started
+            with open('state.json') as f:
+                state = json.load(f)
+
+            started = time.perf_counter()
+            peering.teardown(spec, state_path='state.json', max_workers=STRATEGIES[strategy])
+            teardown_seconds = time.perf_counter() - started
+            leftovers = leftover_resources(regions, spec['name'])
+        finally:
+            os.chdir(cwd)
+            peering.ec2_clients.clear()
+            peering.pollers.clear()
+
+    name = f"{mode} {len(regions)} regions {strategy}"
+    links = state.get('transit' if mode == 'hub' else 'peerings', {})
+    expected = len(regions) - 1 if mode == 'hub' else len(regions) * (len(regions) - 1) // 2
+    routed = sum(1 for link in links.values() if link.get('Routed'))
+    if routed != expected:
+        raise RuntimeError(f"{name}: only {routed} of {expected} links were routed")
+    if leftovers:
+        raise RuntimeError(f"{name}: teardown left {len(leftovers)} resources behind: {', '.join(leftovers[:5])}")
+
+    with open(os.path.join(rundir, 'timeline.json')) as f:
+        summary = json.load(f)['summary']
+    totals = summary['totals']
+    critical_path = list(summary['critical_path'].items())[:2]
+    return {
+        'mode': mode,
+        'regions': len(regions),
+        'strategy': strategy,
+        'seconds': round(seconds, 3),
+        'api_calls': sum(entry['count'] for name, entry in totals.items() if name.startswith('api ')),
+        'api_seconds': round(sum(entry['seconds'] for name, entry in totals.items() if name.startswith('api ')), 1),
+        'links': f"{routed}/{expected}",
+        'teardown_s': round(teardown_seconds, 3),
+        'critical_path': ', '.join(f"{name} {value}s" for name, value in critical_path),
+    }
+
+
+def print_table(results):
+    columns = ['mode', 'regions', 'strategy', 'seconds', 'speedup', 'api_calls', 'api_seconds', 'links',
+               'teardown_s', 'critical_path']
+    widths = [max(len(column), *(len(str(row[column])) for row in results)) for column in columns]
+    print('  '.join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in results:
+        print('  '.join(str(row[column]).ljust(width) for column, width in zip(columns, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark peering.py provisioning against a mocked EC2.')
+    parser.add_argument('--regions', type=int, nargs='+', default=[5, 15, 30], help='Topology sizes to build')
+    parser.add_argument('--mode', choices=['mesh', 'hub'], default='mesh', help='Topology mode')
+    parser.add_argument('--strategy', choices=sorted(STRATEGIES), action='append',
+                        help='Strategy to run, may be repeated. Runs all by default')
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds added to every EC2 call')
+    parser.add_argument('--jitter', type=float, default=0.02, help='Up to this many extra random seconds per call')
+    parser.add_argument('--poll-delay', type=float, default=1, help='Initial delay between status polls')
+    parser.add_argument('--verbose', action='store_true', help='Show the peering.py log')
+    parser.add_argument('--json', dest='json_path', help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    # mock_aws accepts any credentials, but botocore still needs some to sign requests
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'benchmark')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark')
+    if args.verbose:
+        peering.configure_logging()
+    else:
+        logger.remove()
+
+    workdir = tempfile.mkdtemp(prefix='peering-benchmark-')
+    try:
+        results = []
+        for count in args.regions:
+            regions = benchmark_regions(count)
+            baseline = None
+            for strategy in args.strategy or list(STRATEGIES):
+                try:
+                    result = run_benchmark(regions, args.mode, strategy, args.latency, args.jitter,
+                                           args.poll_delay, workdir)
+                except RuntimeError as e:
+                    print(e)
+                    return 1
+                baseline = baseline or result['seconds']
+                result['speedup'] = round(baseline / result['seconds'], 1)
+                results.append(result)
+        print_table(results)
+        if args.json_path:
+            with open(args.json_path, 'w') as f:
+                json.dump(results, f, indent=2)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
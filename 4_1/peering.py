@@ -1,339 +1,1333 @@
 import boto3
+from botocore.exceptions import ClientError
 import sys
 from loguru import logger
+import argparse
+import bisect
+import ipaddress
 import json
+import os
 import time
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from itertools import combinations
 
 
+def configure_logging(level="DEBUG"):
+    logger.remove()
 
-logger.remove()
-
-logger.add(
-    sink=sys.stdout,
-    format="<level>{time:HH:mm:ss}</level> | <level>{level: <8}</level>:{line} | <level>{message}</level>",
-    level="DEBUG"
-)
-common_regions = ['eu-central-1', 'eu-west-1', 'eu-west-2', 'eu-west-3', 'eu-north-1']
-
-def create_vpc(region_name, c):
-    vpcs = {}
-    # Create an EC2 client
-    ec2 = boto3.client('ec2', region_name=region_name)
-    vpcs['region_name'] = region_name
-    response = ec2.describe_availability_zones()
-    zone_names = [zone['ZoneName'] for zone in response['AvailabilityZones']]
-    # Create a VPC
-    cidr = '10.' + str(c) + '.0.0/16'
-
-    vpcs['cidr'] = '10.' + str(c) + '.0.0/16'
-
-    vpc = ec2.create_vpc(
-        CidrBlock=cidr
-    )
-
-    # Wait for the VPC to be available
-    waiter = ec2.get_waiter('vpc_available')
-    waiter.wait(VpcIds=[vpc['Vpc']['VpcId']])
-
-    logger.info("Created VPC with ID: {}", vpc['Vpc']['VpcId'])
-
-    vpcs['VpcId'] = vpc['Vpc']['VpcId']
-
-    # Enable DNS support for the VPC
-    ec2.modify_vpc_attribute(
-        VpcId=vpc['Vpc']['VpcId'],
-        EnableDnsSupport={'Value': True}
-    )
-
-    # Enable DNS hostnames for the VPC
-    ec2.modify_vpc_attribute(
-        VpcId=vpc['Vpc']['VpcId'],
-        EnableDnsHostnames={'Value': True}
-    )
-
-    # Create an Internet Gateway
-    igw = ec2.create_internet_gateway()
-
-    logger.info("Created Internet Gateway with ID: {}", igw['InternetGateway']['InternetGatewayId'])
-
-    # Attach the Internet Gateway to the VPC
-    ec2.attach_internet_gateway(
-        InternetGatewayId=igw['InternetGateway']['InternetGatewayId'],
-        VpcId=vpc['Vpc']['VpcId']
+    logger.add(
+        sink=sys.stdout,
+        format="<level>{time:HH:mm:ss}</level> | <level>{level: <8}</level>:{line} | <level>{message}</level>",
+        level=level
     )
 
-    vpcs['InternetGatewayId'] = igw['InternetGateway']['InternetGatewayId']
 
-    # Create three subnets in the VPC
-    subnet1 = ec2.create_subnet(
-        VpcId=vpc['Vpc']['VpcId'],
-        CidrBlock='10.' + str(c) + '.0.0/24',
-        AvailabilityZone=zone_names[0]
-    )
+common_regions = ['eu-central-1', 'eu-west-1', 'eu-west-2', 'eu-west-3', 'eu-north-1']
+# Every resource is tagged with the topology it belongs to, so a rerun can find it again
+TOPOLOGY_TAG = 'Topology'
+topology_name = 'peering-mesh'
+
+# Desired layout. Regions are names or dicts overriding the sizes for that region, e.g.
+# {'region_name': 'ap-south-2', 'subnets': 2, 'subnet_prefix': 22} or a pinned 'cidr'.
+# 'mode' is 'mesh' (VPC peering between every pair of regions) or 'hub' (a transit gateway per
+# region, each peered with the gateway in 'hub_region', which defaults to the first region).
+default_topology = {
+    'name': topology_name,
+    'mode': 'mesh',
+    'supernets': ['10.0.0.0/8'],
+    'vpc_prefix': 16,
+    'subnets': 3,
+    'subnet_prefix': 24,
+    'regions': common_regions,
+}
+
+ec2_clients = {}
+ec2_clients_lock = threading.Lock()
+
+
+class Timeline:
+    # Spans of EC2 calls ('api'), status waits ('wait') and provisioning steps ('phase'),
+    # with offsets in seconds from the start of the run.
+    def __init__(self):
+        self.started_at = time.time()
+        self.started = time.monotonic()
+        self.spans = []
+        self.lock = threading.Lock()
+
+    def add(self, kind, name, region_name, resource, start, end):
+        with self.lock:
+            self.spans.append({
+                'kind': kind,
+                'name': name,
+                'region_name': region_name,
+                'resource': resource,
+                'start': round(start - self.started, 4),
+                'end': round(end - self.started, 4),
+                'thread': threading.current_thread().name,
+            })
+
+    def critical_path(self):
+        # Walk back from the last span to finish, each time taking the latest span that ended before
+        # the current one started. Gaps between them are local work or idle threads.
+        leaves = sorted((span for span in self.spans if span['kind'] != 'phase'), key=lambda span: span['end'])
+        ends = [span['end'] for span in leaves]
+        path = []
+        index = len(leaves) - 1
+        while index >= 0:
+            current = leaves[index]
+            path.append(current)
+            # Only spans sorted before the current one, so zero-length spans cannot be their own predecessor
+            index = min(bisect.bisect_right(ends, current['start']), index) - 1
+        return path[::-1]
+
+    def summary(self):
+        totals = {}
+        for span in self.spans:
+            entry = totals.setdefault(f"{span['kind']} {span['name']}", {'count': 0, 'seconds': 0.0, 'max': 0.0})
+            duration = span['end'] - span['start']
+            entry['count'] += 1
+            entry['seconds'] = round(entry['seconds'] + duration, 4)
+            entry['max'] = round(max(entry['max'], duration), 4)
+        critical = defaultdict(float)
+        path = self.critical_path()
+        for span in path:
+            critical[f"{span['kind']} {span['name']}"] += span['end'] - span['start']
+        seconds = max((span['end'] for span in self.spans), default=0.0)
+        critical['gaps'] = seconds - sum(critical.values())
+        return {
+            'seconds': round(seconds, 3),
+            'totals': totals,
+            'critical_path': {name: round(value, 3) for name, value in
+                              sorted(critical.items(), key=lambda item: item[1], reverse=True)},
+        }
 
-    waiter = ec2.get_waiter('subnet_available')
-    waiter.wait(
-        SubnetIds=[subnet1['Subnet']['SubnetId']],
-        Filters=[
-            {
-                'Name': 'state',
-                'Values': ['available']
-            }
-        ],
-        WaiterConfig={
-            'Delay': 1,
-            'MaxAttempts': 120
+    def gantt(self, width=60):
+        seconds = max((span['end'] for span in self.spans), default=0.0) or 1.0
+        critical = {id(span) for span in self.critical_path()}
+        rows = {}
+        for span in sorted(self.spans, key=lambda span: span['start']):
+            rows.setdefault((span['kind'], span['region_name'] or '-', span['name']), []).append(span)
+        lines = [f"{'':<58} 0s{'':<{width - 8}}{seconds:>6.1f}s"]
+        for (kind, region_name, name), spans in rows.items():
+            bar = [' '] * width
+            for span in spans:
+                first = min(width - 1, int(span['start'] / seconds * width))
+                last = max(first + 1, int(span['end'] / seconds * width))
+                for cell in range(first, min(last, width)):
+                    if id(span) in critical:
+                        bar[cell] = '*'
+                    elif bar[cell] != '*':
+                        bar[cell] = '#'
+            label = f"{kind:<5} {region_name:<14} {name} x{len(spans)}"
+            lines.append(f"{label[:57]:<57} |{''.join(bar)}|")
+        lines.append("'*' marks the critical path")
+        return '\n'.join(lines)
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'started_at': self.started_at, 'summary': self.summary(),
+                       'critical_path': self.critical_path(), 'spans': self.spans}, f, indent=2)
+        with open(os.path.splitext(path)[0] + '.txt', 'w') as f:
+            f.write(self.gantt() + '\n')
+
+
+timeline = None
+
+
+@contextmanager
+def profiling(profile_path):
+    global timeline
+    if not profile_path:
+        yield
+        return
+    timeline = Timeline()
+    try:
+        yield
+    finally:
+        timeline.save(profile_path)
+        logger.info("Provisioning timeline:\n" + timeline.gantt())
+        logger.info(f"Critical path: {json.dumps(timeline.summary()['critical_path'])}")
+        logger.info(f"Timeline written to {profile_path}")
+        timeline = None
+
+
+@contextmanager
+def span(kind, name, region_name=None, resource=None):
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        if timeline:
+            timeline.add(kind, name, region_name, resource, started, time.monotonic())
+
+
+def describe_resource(ids):
+    ids = sorted(map(str, ids))
+    return ','.join(ids[:3]) + (f" +{len(ids) - 3}" if len(ids) > 3 else '')
+
+
+def record_call_start(params, context, **kwargs):
+    context['timeline_started'] = time.monotonic()
+    for key, value in params.items():
+        if key.endswith('Id') and isinstance(value, str):
+            context['timeline_resource'] = value
+            return
+        if key.endswith('Ids') and value:
+            context['timeline_resource'] = describe_resource(value)
+            return
+
+
+def record_call_end(region_name, model, context, **kwargs):
+    started = context.get('timeline_started')
+    if timeline and started is not None:
+        timeline.add('api', model.name, region_name, context.get('timeline_resource'), started, time.monotonic())
+
+
+def get_ec2_client(region_name):
+    # boto3.client() is not thread-safe on the default session, so clients are created once per region under a lock
+    with ec2_clients_lock:
+        if region_name not in ec2_clients:
+            ec2 = boto3.client('ec2', region_name=region_name)
+            ec2.meta.events.register('before-call.ec2', record_call_start)
+            ec2.meta.events.register('after-call.ec2', partial(record_call_end, region_name))
+            ec2_clients[region_name] = ec2
+        return ec2_clients[region_name]
+
+
+FAILED_PEERING_CODES = ('failed', 'rejected', 'expired', 'deleted')
+FAILED_ATTACHMENT_STATES = ('failed', 'failing', 'rejected', 'rejecting', 'deleted', 'deleting')
+
+
+def describe_vpc_states(ec2, vpc_ids):
+    pages = ec2.get_paginator('describe_vpcs').paginate(Filters=[{'Name': 'vpc-id', 'Values': vpc_ids}])
+    return {vpc['VpcId']: vpc['State'] for page in pages for vpc in page['Vpcs']}
+
+
+def describe_subnet_states(ec2, subnet_ids):
+    pages = ec2.get_paginator('describe_subnets').paginate(Filters=[{'Name': 'subnet-id', 'Values': subnet_ids}])
+    return {subnet['SubnetId']: subnet['State'] for page in pages for subnet in page['Subnets']}
+
+
+def describe_peering_states(ec2, peering_connection_ids):
+    # Filters instead of VpcPeeringConnectionIds: ids not yet replicated to this region are just pending
+    pages = ec2.get_paginator('describe_vpc_peering_connections').paginate(
+        Filters=[{'Name': 'vpc-peering-connection-id', 'Values': peering_connection_ids}])
+    return {connection['VpcPeeringConnectionId']: connection['Status']['Code']
+            for page in pages for connection in page['VpcPeeringConnections']}
+
+
+def describe_route_states(ec2, routes):
+    # routes: (route_table_id, destination_cidr_block) pairs
+    route_table_ids = sorted({route_table_id for route_table_id, _ in routes})
+    pages = ec2.get_paginator('describe_route_tables').paginate(
+        Filters=[{'Name': 'route-table-id', 'Values': route_table_ids}])
+    return {(route_table['RouteTableId'], route.get('DestinationCidrBlock')): route.get('State')
+            for page in pages for route_table in page['RouteTables'] for route in route_table['Routes']}
+
+
+def describe_transit_gateway_states(ec2, transit_gateway_ids):
+    pages = ec2.get_paginator('describe_transit_gateways').paginate(
+        Filters=[{'Name': 'transit-gateway-id', 'Values': transit_gateway_ids}])
+    return {gateway['TransitGatewayId']: gateway['State'] for page in pages for gateway in page['TransitGateways']}
+
+
+def describe_attachment_states(ec2, attachment_ids):
+    # VPC and peering attachments alike; peering attachments show up in the accepter region asynchronously
+    pages = ec2.get_paginator('describe_transit_gateway_attachments').paginate(
+        Filters=[{'Name': 'transit-gateway-attachment-id', 'Values': attachment_ids}])
+    return {attachment['TransitGatewayAttachmentId']: attachment['State']
+            for page in pages for attachment in page['TransitGatewayAttachments']}
+
+
+def describe_transit_route_states(ec2, routes):
+    # routes: (transit_gateway_route_table_id, destination_cidr_block) pairs, one search per route table
+    found = {}
+    for route_table_id in sorted({route_table_id for route_table_id, _ in routes}):
+        response = ec2.search_transit_gateway_routes(
+            TransitGatewayRouteTableId=route_table_id,
+            Filters=[{'Name': 'state', 'Values': ['active', 'blackhole']}])
+        found.update({(route_table_id, route['DestinationCidrBlock']): route['State'] for route in response['Routes']})
+    return found
+
+
+# resource type -> (function returning {id: state} for a list of ids, states that mean the wait failed)
+RESOURCE_TYPES = {
+    'vpc': (describe_vpc_states, ()),
+    'subnet': (describe_subnet_states, ()),
+    'peering': (describe_peering_states, FAILED_PEERING_CODES),
+    'route': (describe_route_states, ()),
+    'transit-gateway': (describe_transit_gateway_states, ('deleted', 'deleting')),
+    'transit-gateway-attachment': (describe_attachment_states, FAILED_ATTACHMENT_STATES),
+    'transit-gateway-route': (describe_transit_route_states, ()),
+}
+
+
+class StatusPoller:
+    # Shared by every thread working in one region: all pending resources of a type are resolved
+    # with a single Describe* call per tick, and the tick interval backs off while nothing changes.
+    max_filter_values = 200
+
+    def __init__(self, ec2, min_delay=1, max_delay=20):
+        self.ec2 = ec2
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.requests = []
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def wait(self, resource_type, ids, states, timeout=600, failed_states=None):
+        # failed_states defaults to those of RESOURCE_TYPES; deletions pass their own, since
+        # 'deleting' is progress there rather than a failure
+        request = {
+            'type': resource_type,
+            'pending': set(ids),
+            'states': states,
+            'failed_states': RESOURCE_TYPES[resource_type][1] if failed_states is None else failed_states,
+            'deadline': time.monotonic() + timeout,
+            'error': None,
+            'done': threading.Event(),
+        }
+        if not request['pending']:
+            return
+        with self.condition:
+            self.requests.append(request)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.poll, daemon=True)
+                self.thread.start()
+            self.condition.notify()
+        with span('wait', resource_type, self.ec2.meta.region_name, describe_resource(ids)):
+            finished = request['done'].wait(timeout=max(0, request['deadline'] - time.monotonic()))
+        if not finished:
+            # The poller checks deadlines only between ticks; do not rely on it to wake us up
+            with self.condition:
+                if not request['error']:
+                    request['error'] = TimeoutError(
+                        f"{resource_type} {sorted(request['pending'])} did not reach {states}")
+        if request['error']:
+            raise request['error']
+
+    def describe(self, resource_type, ids):
+        describe, _ = RESOURCE_TYPES[resource_type]
+        ids = sorted(ids)
+        found = {}
+        for start in range(0, len(ids), self.max_filter_values):
+            found.update(describe(self.ec2, ids[start:start + self.max_filter_values]))
+        return found
+
+    def tick(self, requests):
+        by_type = defaultdict(set)
+        for request in requests:
+            by_type[request['type']] |= request['pending']
+        progressed = False
+        for resource_type, ids in by_type.items():
+            try:
+                found = self.describe(resource_type, ids)
+            except ClientError as e:
+                if e.response['Error']['Code'] in ('RequestLimitExceeded', 'Throttling'):
+                    logger.warning(f"Throttled while polling {resource_type} status, backing off")
+                    continue
+                for request in requests:
+                    if request['type'] == resource_type:
+                        request['error'] = e
+                continue
+            for request in requests:
+                if request['type'] != resource_type or request['error']:
+                    continue
+                for resource_id in list(request['pending']):
+                    state = found.get(resource_id)
+                    if state in request['states']:
+                        request['pending'].discard(resource_id)
+                        progressed = True
+                    elif state in request['failed_states']:
+                        request['error'] = RuntimeError(f"{resource_type} {resource_id} is {state}")
+        return progressed
+
+    def poll(self):
+        delay = self.min_delay
+        try:
+            while True:
+                with self.condition:
+                    requests = list(self.requests)
+                progressed = self.tick(requests)
+                now = time.monotonic()
+                with self.condition:
+                    for request in requests:
+                        if request['pending'] and not request['error'] and now > request['deadline']:
+                            request['error'] = TimeoutError(
+                                f"{request['type']} {sorted(request['pending'])} did not reach {request['states']}")
+                        if request['error'] or not request['pending']:
+                            self.requests.remove(request)
+                            request['done'].set()
+                    if not self.requests:
+                        self.thread = None
+                        return
+                    delay = self.min_delay if progressed else min(delay * 2, self.max_delay)
+                    # New requests wake the poller early, since fresh resources usually resolve quickly
+                    if self.condition.wait(timeout=delay):
+                        delay = self.min_delay
+        except Exception as e:
+            # Connection errors and read timeouts are not ClientErrors; hand them to every waiter
+            # instead of leaving them blocked on a poller that no longer runs
+            logger.error(f"Status poller in {self.ec2.meta.region_name} failed: {e!r}")
+            with self.condition:
+                for request in self.requests:
+                    request['error'] = request['error'] or e
+                    request['done'].set()
+                self.requests = []
+        finally:
+            with self.condition:
+                # A new poller may already have been started after this one returned normally
+                if self.thread is threading.current_thread():
+                    self.thread = None
+
+
+pollers = {}
+pollers_lock = threading.Lock()
+
+
+def get_poller(region_name):
+    with pollers_lock:
+        if region_name not in pollers:
+            pollers[region_name] = StatusPoller(get_ec2_client(region_name))
+        return pollers[region_name]
+
+
+class TopologyState:
+    # Every resource is written to the state file as soon as it exists, so a rerun after a partial
+    # failure picks up where the last one stopped instead of creating duplicates.
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.data = {'vpcs': {}, 'peerings': {}}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.data.update(json.load(f))
+
+    def vpc(self, region_name):
+        with self.lock:
+            return self.data['vpcs'].setdefault(region_name, {'region_name': region_name})
+
+    def peering(self, key):
+        with self.lock:
+            return self.data['peerings'].setdefault(key, {})
+
+    def transit(self, key):
+        with self.lock:
+            return self.data.setdefault('transit', {}).setdefault(key, {})
+
+    def record(self, record, key, value, index=None, size=None):
+        with self.lock:
+            if index is None:
+                record[key] = value
+            else:
+                items = record.setdefault(key, [])
+                items.extend([None] * (size - len(items)))
+                items[index] = value
+            self.save()
+
+    def merge(self, record, values):
+        with self.lock:
+            record.update(values)
+            self.save()
+
+    def forget(self, section, key):
+        with self.lock:
+            self.data.get(section, {}).pop(key, None)
+            self.save()
+
+    def save(self):
+        # Callers hold self.lock
+        if not self.path:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def load_topology(path):
+    with open(path) as f:
+        spec = json.load(f)
+    return dict(default_topology, **spec)
+
+
+def region_specs(spec):
+    for region in spec['regions']:
+        if isinstance(region, str):
+            region = {'region_name': region}
+        yield {
+            'region_name': region['region_name'],
+            'cidr': region.get('cidr'),
+            'vpc_prefix': region.get('vpc_prefix', spec['vpc_prefix']),
+            'subnets': region.get('subnets', spec['subnets']),
+            'subnet_prefix': region.get('subnet_prefix', spec['subnet_prefix']),
         }
-    )
-    vpcs['Subnets'] = []
-    vpcs['Subnets'].append(subnet1['Subnet']['SubnetId'])
 
-    logger.info("Created Subnet 1 with ID: {}", subnet1['Subnet']['SubnetId'])
 
-    subnet2 = ec2.create_subnet(
-        VpcId=vpc['Vpc']['VpcId'],
-        CidrBlock='10.' + str(c) + '.1.0/24',
-        AvailabilityZone=zone_names[1]
-    )
+class CidrAllocator:
+    # Buddy-style allocator: each block is carved from the smallest free block that fits,
+    # so large free blocks stay whole for later, larger requests.
+    def __init__(self, pools):
+        self.pools = [ipaddress.ip_network(pool) for pool in pools]
+        self.free = list(self.pools)
+
+    def reserve(self, cidr):
+        network = ipaddress.ip_network(cidr)
+        if not any(network.subnet_of(pool) for pool in self.pools):
+            raise ValueError(f"{cidr} is outside {', '.join(map(str, self.pools))}")
+        for block in self.free:
+            if network.subnet_of(block):
+                self.free.remove(block)
+                self.free.extend(block.address_exclude(network))
+                return
+        raise ValueError(f"{cidr} overlaps a block that is already allocated")
+
+    def allocate(self, prefixlen):
+        candidates = [block for block in self.free if block.prefixlen <= prefixlen]
+        if not candidates:
+            raise ValueError(f"No free /{prefixlen} left in {', '.join(map(str, self.pools))}")
+        block = min(candidates, key=lambda block: (-block.prefixlen, block.network_address))
+        network = next(block.subnets(new_prefix=prefixlen))
+        self.free.remove(block)
+        self.free.extend(block.address_exclude(network))
+        return str(network)
+
+
+def plan_topology(spec, state):
+    # Desired CIDRs per region. Blocks already recorded in the state are kept, so replanning
+    # after a spec change never moves an existing VPC or subnet.
+    regions = list(region_specs(spec))
+    if spec['mode'] == 'hub' and hub_region(spec) not in [region['region_name'] for region in regions]:
+        raise ValueError(f"hub_region {hub_region(spec)} is not one of the topology's regions")
+    allocator = CidrAllocator(spec['supernets'])
+    cidrs = {}
+    for region in regions:
+        cidr = region['cidr'] or state.vpc(region['region_name']).get('cidr')
+        if cidr:
+            allocator.reserve(cidr)
+            cidrs[region['region_name']] = cidr
+    # Largest blocks first packs mixed sizes without gaps
+    for region in sorted(regions, key=lambda region: region['vpc_prefix']):
+        if region['region_name'] not in cidrs:
+            cidrs[region['region_name']] = allocator.allocate(region['vpc_prefix'])
+
+    desired = []
+    for region in regions:
+        region_name = region['region_name']
+        subnet_allocator = CidrAllocator([cidrs[region_name]])
+        existing = (state.vpc(region_name).get('SubnetCidrs') or [])[:region['subnets']]
+        for cidr in existing:
+            if cidr:
+                subnet_allocator.reserve(cidr)
+        existing = existing + [None] * (region['subnets'] - len(existing))
+        subnets = [cidr or subnet_allocator.allocate(region['subnet_prefix']) for cidr in existing]
+        desired.append({'region_name': region_name, 'cidr': cidrs[region_name], 'subnets': subnets})
+    return desired
+
+
+def is_provisioned(vpcs, desired_vpc):
+    subnet_ids = vpcs.get('Subnets') or []
+    return bool(vpcs.get('Ready')) and len(subnet_ids) == len(desired_vpc['subnets']) and all(subnet_ids)
+
+
+def hub_region(spec):
+    return spec.get('hub_region') or next(region_specs(spec))['region_name']
+
+
+def diff_topology(desired, state, spec=None):
+    # The API calls still needed to get from the recorded state to the desired topology
+    spec = spec or default_topology
+    steps = []
+    for desired_vpc in desired:
+        region_name = desired_vpc['region_name']
+        vpcs = state.vpc(region_name)
+        if is_provisioned(vpcs, desired_vpc):
+            continue
+        if not vpcs.get('VpcId'):
+            steps.append((region_name, 'CreateVpc', desired_vpc['cidr']))
+        if not vpcs.get('InternetGatewayId'):
+            steps.append((region_name, 'CreateInternetGateway', ''))
+        subnet_ids = vpcs.get('Subnets') or []
+        for i, cidr in enumerate(desired_vpc['subnets']):
+            if i >= len(subnet_ids) or not subnet_ids[i]:
+                steps.append((region_name, 'CreateSubnet', cidr))
+        if not vpcs.get('RouteTableId'):
+            steps.append((region_name, 'CreateRouteTable', ''))
+        steps.append((region_name, 'CreateRoute', '0.0.0.0/0'))
+        steps.append((region_name, 'AssociateRouteTable', f"{len(desired_vpc['subnets'])} subnets"))
+    if spec['mode'] == 'hub':
+        return steps + diff_transit_hub(desired, state, spec)
+    for vpc1, vpc2 in combinations(desired, 2):
+        record = state.peering(peering_key(vpc1, vpc2))
+        link = f"{vpc1['region_name']} <-> {vpc2['region_name']}"
+        if not record.get('VpcPeeringConnectionId'):
+            steps.append((vpc1['region_name'], 'CreateVpcPeeringConnection', link))
+            steps.append((vpc2['region_name'], 'AcceptVpcPeeringConnection', link))
+        if not record.get('Routed'):
+            steps.append((vpc1['region_name'], 'CreateRoute', vpc2['cidr']))
+            steps.append((vpc2['region_name'], 'CreateRoute', vpc1['cidr']))
+    return steps
+
+
+def diff_transit_hub(desired, state, spec):
+    steps = []
+    hub_name = hub_region(spec)
+    for desired_vpc in desired:
+        region_name = desired_vpc['region_name']
+        vpcs = state.vpc(region_name)
+        if not vpcs.get('TransitGatewayId'):
+            steps.append((region_name, 'CreateTransitGateway', ''))
+        if not vpcs.get('TransitGatewayAttachmentId'):
+            steps.append((region_name, 'CreateTransitGatewayVpcAttachment', vpcs.get('VpcId', desired_vpc['cidr'])))
+            for supernet in spec['supernets']:
+                steps.append((region_name, 'CreateRoute', supernet))
+        if region_name == hub_name:
+            continue
+        record = state.transit(peering_key(desired_vpc, {'region_name': hub_name}))
+        link = f"{region_name} <-> {hub_name}"
+        if not record.get('TransitGatewayAttachmentId'):
+            steps.append((region_name, 'CreateTransitGatewayPeeringAttachment', link))
+            steps.append((hub_name, 'AcceptTransitGatewayPeeringAttachment', link))
+        if not record.get('Routed'):
+            for supernet in spec['supernets']:
+                steps.append((region_name, 'CreateTransitGatewayRoute', supernet))
+            steps.append((hub_name, 'CreateTransitGatewayRoute', desired_vpc['cidr']))
+    return steps
+
+
+def tag_specifications(resource_type, name, topology):
+    return [{
+        'ResourceType': resource_type,
+        'Tags': [
+            {'Key': 'Name', 'Value': name},
+            {'Key': TOPOLOGY_TAG, 'Value': topology},
+        ]
+    }]
+
+
+def ignore_errors(error_codes, fn, **kwargs):
+    # Makes a create or delete call safe to repeat on a rerun
+    try:
+        return fn(**kwargs)
+    except ClientError as e:
+        if e.response['Error']['Code'] not in error_codes:
+            raise
+
+
+def discover_vpc(ec2, desired_vpc, topology):
+    # Rebuild a lost state record from the tags put on every resource at creation
+    vpcs = {}
+    tag_filter = {'Name': 'tag:' + TOPOLOGY_TAG, 'Values': [topology]}
+    found = ec2.describe_vpcs(Filters=[tag_filter, {'Name': 'cidr', 'Values': [desired_vpc['cidr']]}])['Vpcs']
+    if not found:
+        return vpcs
+    vpc_id = found[0]['VpcId']
+    vpcs['VpcId'] = vpc_id
+    vpc_filter = {'Name': 'vpc-id', 'Values': [vpc_id]}
+    igws = ec2.describe_internet_gateways(Filters=[{'Name': 'attachment.vpc-id', 'Values': [vpc_id]}])['InternetGateways']
+    if igws:
+        vpcs['InternetGatewayId'] = igws[0]['InternetGatewayId']
+    route_tables = ec2.describe_route_tables(Filters=[tag_filter, vpc_filter])['RouteTables']
+    if route_tables:
+        vpcs['RouteTableId'] = route_tables[0]['RouteTableId']
+    subnets = {subnet['CidrBlock']: subnet['SubnetId']
+               for subnet in ec2.describe_subnets(Filters=[tag_filter, vpc_filter])['Subnets']}
+    if subnets:
+        vpcs['Subnets'] = [subnets.get(cidr) for cidr in desired_vpc['subnets']]
+        vpcs['SubnetCidrs'] = list(desired_vpc['subnets'])
+    logger.info("Found existing resources of VPC {} in {} by tag", vpc_id, desired_vpc['region_name'])
+    return vpcs
 
-    waiter.wait(
-        SubnetIds=[subnet2['Subnet']['SubnetId']],
-        Filters=[
-            {
-                'Name': 'state',
-                'Values': ['available']
-            }
-        ],
-        WaiterConfig={
-            'Delay': 1,
-            'MaxAttempts': 120
-        }
+
+def discover_transit_gateway(ec2, vpc_id, topology):
+    found = {}
+    gateways = ec2.describe_transit_gateways(Filters=[
+        {'Name': 'tag:' + TOPOLOGY_TAG, 'Values': [topology]},
+        {'Name': 'state', 'Values': ['pending', 'available']},
+    ])['TransitGateways']
+    if not gateways:
+        return found
+    found['TransitGatewayId'] = gateways[0]['TransitGatewayId']
+    if vpc_id:
+        attachments = ec2.describe_transit_gateway_attachments(Filters=[
+            {'Name': 'transit-gateway-id', 'Values': [found['TransitGatewayId']]},
+            {'Name': 'resource-id', 'Values': [vpc_id]},
+            {'Name': 'state', 'Values': ['pending', 'available']},
+        ])['TransitGatewayAttachments']
+        if attachments:
+            found['TransitGatewayAttachmentId'] = attachments[0]['TransitGatewayAttachmentId']
+    return found
+
+
+def reconcile_vpc(desired_vpc, state, topology):
+    vpcs = state.vpc(desired_vpc['region_name'])
+    ec2 = get_ec2_client(desired_vpc['region_name'])
+    if not vpcs.get('VpcId'):
+        state.merge(vpcs, discover_vpc(ec2, desired_vpc, topology))
+    if not vpcs.get('TransitGatewayId'):
+        state.merge(vpcs, discover_transit_gateway(ec2, vpcs.get('VpcId'), topology))
+
+
+def create_subnet(ec2, state, vpcs, i, size, cidr, zone_name, topology):
+    subnet = ec2.create_subnet(
+        VpcId=vpcs['VpcId'],
+        CidrBlock=cidr,
+        AvailabilityZone=zone_name,
+        TagSpecifications=tag_specifications('subnet', f"{topology}-{vpcs['region_name']}-{i + 1}", topology)
     )
+    subnet_id = subnet['Subnet']['SubnetId']
+    state.record(vpcs, 'SubnetCidrs', cidr, index=i, size=size)
+    state.record(vpcs, 'Subnets', subnet_id, index=i, size=size)
+    return subnet_id
 
-    vpcs['Subnets'].append(subnet2['Subnet']['SubnetId'])
 
-    logger.info("Created Subnet 2 with ID: {}", subnet2['Subnet']['SubnetId'])
+def create_internet_gateway(ec2, state, vpcs, topology):
+    igw_id = vpcs.get('InternetGatewayId')
+    if not igw_id:
+        igw = ec2.create_internet_gateway(
+            TagSpecifications=tag_specifications('internet-gateway', f"{topology}-{vpcs['region_name']}", topology))
+        igw_id = igw['InternetGateway']['InternetGatewayId']
+        state.record(vpcs, 'InternetGatewayId', igw_id)
 
-    subnet3 = ec2.create_subnet(
-        VpcId=vpc['Vpc']['VpcId'],
-        CidrBlock='10.' + str(c) + '.2.0/24',
-        AvailabilityZone=zone_names[2]
-    )
+        logger.info("Created Internet Gateway with ID: {}", igw_id)
 
-    waiter.wait(
-        SubnetIds=[subnet3['Subnet']['SubnetId']],
-        Filters=[
-            {
-                'Name': 'state',
-                'Values': ['available']
-            }
-        ],
-        WaiterConfig={
-            'Delay': 1,
-            'MaxAttempts': 120
-        }
+    # Attach the Internet Gateway to the VPC
+    ignore_errors(
+        ('Resource.AlreadyAssociated',),
+        ec2.attach_internet_gateway,
+        InternetGatewayId=igw_id,
+        VpcId=vpcs['VpcId']
     )
+    return igw_id
+
+
+def create_route_table(ec2, state, vpcs, topology):
+    route_table = ec2.create_route_table(
+        VpcId=vpcs['VpcId'],
+        TagSpecifications=tag_specifications('route-table', f"{topology}-{vpcs['region_name']}", topology))
+    route_table_id = route_table['RouteTable']['RouteTableId']
+    state.record(vpcs, 'RouteTableId', route_table_id)
+    logger.info("Created Route Table with ID: {}", route_table_id)
+    return route_table_id
+
+
+def create_vpc(region_name, desired_vpc, state=None, topology=None, max_workers=8):
+    state = state or TopologyState()
+    topology = topology or topology_name
+    vpcs = state.vpc(region_name)
+    if is_provisioned(vpcs, desired_vpc):
+        logger.info("VPC {} in {} is already provisioned", vpcs['VpcId'], region_name)
+        return vpcs
+    # Create an EC2 client
+    ec2 = get_ec2_client(region_name)
+    response = ec2.describe_availability_zones(Filters=[{'Name': 'state', 'Values': ['available']}])
+    zone_names = sorted(zone['ZoneName'] for zone in response['AvailabilityZones'])
+    # Create a VPC
+    cidr = desired_vpc['cidr']
 
-    vpcs['Subnets'].append(subnet3['Subnet']['SubnetId'])
-
-    logger.info("Created Subnet 3 with ID: {}", subnet3['Subnet']['SubnetId'])
-
-    # Create a route table for the VPC
-    route_table = ec2.create_route_table(VpcId=vpc['Vpc']['VpcId'])
+    if 'cidr' not in vpcs:
+        state.record(vpcs, 'cidr', cidr)
+    state.record(vpcs, 'Ready', False)
 
-    vpcs['RouteTableId'] = route_table['RouteTable']['RouteTableId']
+    vpc_id = vpcs.get('VpcId')
+    if not vpc_id:
+        vpc = ec2.create_vpc(
+            CidrBlock=cidr,
+            TagSpecifications=tag_specifications('vpc', f"{topology}-{region_name}", topology)
+        )
+        vpc_id = vpc['Vpc']['VpcId']
+        state.record(vpcs, 'VpcId', vpc_id)
 
-    logger.info("Created Route Table with ID: {}", route_table['RouteTable']['RouteTableId'])
+    # Wait for the VPC to be available
+    poller = get_poller(region_name)
+    poller.wait('vpc', [vpc_id], ('available',))
+
+    logger.info("Created VPC with ID: {}", vpc_id)
+
+    # Everything below only depends on the VPC, so it is created in parallel and joined at the end
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Enable DNS support and DNS hostnames for the VPC
+        dns_support = executor.submit(ec2.modify_vpc_attribute, VpcId=vpc_id, EnableDnsSupport={'Value': True})
+        dns_hostnames = executor.submit(ec2.modify_vpc_attribute, VpcId=vpc_id, EnableDnsHostnames={'Value': True})
+
+        # Create and attach an Internet Gateway
+        igw = executor.submit(create_internet_gateway, ec2, state, vpcs, topology)
+
+        # Create the subnets the VPC does not have yet, spread over the region's zones
+        size = len(desired_vpc['subnets'])
+        existing_subnets = ((vpcs.get('Subnets') or []) + [None] * size)[:size]
+        subnets = [
+            executor.submit(create_subnet, ec2, state, vpcs, i, size, subnet_cidr, zone_names[i % len(zone_names)], topology)
+            if not subnet_id else None
+            for i, (subnet_id, subnet_cidr) in enumerate(zip(existing_subnets, desired_vpc['subnets']))
+        ]
+
+        # Create a route table for the VPC
+        route_table = None
+        if not vpcs.get('RouteTableId'):
+            route_table = executor.submit(create_route_table, ec2, state, vpcs, topology)
+
+        dns_support.result()
+        dns_hostnames.result()
+        igw_id = igw.result()
+        subnet_ids = [subnet.result() if subnet else subnet_id for subnet, subnet_id in zip(subnets, existing_subnets)]
+        route_table_id = route_table.result() if route_table else vpcs['RouteTableId']
+
+    # Wait for all subnets at once
+    poller.wait('subnet', subnet_ids, ('available',))
+
+    for i, subnet_id in enumerate(subnet_ids):
+        logger.info("Created Subnet {} with ID: {}", i + 1, subnet_id)
 
     # Create a route to the Internet Gateway in the route table
-    ec2.create_route(
+    ignore_errors(
+        ('RouteAlreadyExists',),
+        ec2.create_route,
         DestinationCidrBlock='0.0.0.0/0',
-        GatewayId=igw['InternetGateway']['InternetGatewayId'],
-        RouteTableId=route_table['RouteTable']['RouteTableId']
+        GatewayId=igw_id,
+        RouteTableId=route_table_id
     )
 
     logger.info("Created route to Internet Gateway in Route Table")
 
     # Associate the subnets with the route table
-    ec2.associate_route_table(
-        SubnetId=subnet1['Subnet']['SubnetId'],
-        RouteTableId=route_table['RouteTable']['RouteTableId']
-    )
-
-    ec2.associate_route_table(
-        SubnetId=subnet2['Subnet']['SubnetId'],
-        RouteTableId=route_table['RouteTable']['RouteTableId']
-    )
-
-    ec2.associate_route_table(
-        SubnetId=subnet3['Subnet']['SubnetId'],
-        RouteTableId=route_table['RouteTable']['RouteTableId']
-    )
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(subnet_ids))) as executor:
+        associations = [
+            executor.submit(ignore_errors, ('Resource.AlreadyAssociated',), ec2.associate_route_table,
+                            SubnetId=subnet_id, RouteTableId=route_table_id)
+            for subnet_id in subnet_ids
+        ]
+        for association in associations:
+            association.result()
 
     logger.info("Associated subnets with Route Table")
 
+    state.record(vpcs, 'Ready', True)
     return vpcs
 
 
-def create_peering(vpc1, vpc2):
-    region_name_1 = vpc1['region_name']
-    region_name_2 = vpc2['region_name']
-    ec2_client_1 = boto3.client('ec2', region_name=region_name_1)
-    ec2_client_2 = boto3.client('ec2', region_name=region_name_2)
-
-    # specify the IDs of the VPCs that we want to connect
-    vpc_id_1 = vpc1['VpcId']
-    vpc_id_2 = vpc2['VpcId']
-
-    # create the VPC peering connection
-    response = ec2_client_1.create_vpc_peering_connection(
-        VpcId=vpc_id_1,
-        PeerVpcId=vpc_id_2,
-        PeerRegion=region_name_2
+def peering_key(vpc1, vpc2):
+    return f"{vpc1['region_name']}|{vpc2['region_name']}"
+
+
+def discover_peering(vpc1, vpc2, topology):
+    ec2 = get_ec2_client(vpc1['region_name'])
+    response = ec2.describe_vpc_peering_connections(Filters=[
+        {'Name': 'tag:' + TOPOLOGY_TAG, 'Values': [topology]},
+        {'Name': 'requester-vpc-info.vpc-id', 'Values': [vpc1['VpcId']]},
+    ])
+    for connection in response['VpcPeeringConnections']:
+        if connection['AccepterVpcInfo'].get('VpcId') != vpc2['VpcId']:
+            continue
+        if connection['Status']['Code'] in FAILED_PEERING_CODES:
+            continue
+        logger.info(f"Found existing VPC peering connection {connection['VpcPeeringConnectionId']} by tag")
+        return connection['VpcPeeringConnectionId']
+
+
+def request_peering(vpc1, vpc2, state, reconcile=False, topology=None):
+    topology = topology or topology_name
+    record = state.peering(peering_key(vpc1, vpc2))
+    peering_connection_id = record.get('VpcPeeringConnectionId')
+    if not peering_connection_id and reconcile:
+        peering_connection_id = discover_peering(vpc1, vpc2, topology)
+    if peering_connection_id:
+        state.record(record, 'VpcPeeringConnectionId', peering_connection_id)
+        return peering_connection_id
+
+    ec2 = get_ec2_client(vpc1['region_name'])
+    response = ec2.create_vpc_peering_connection(
+        VpcId=vpc1['VpcId'],
+        PeerVpcId=vpc2['VpcId'],
+        PeerRegion=vpc2['region_name'],
+        TagSpecifications=tag_specifications('vpc-peering-connection', f"{topology}-{peering_key(vpc1, vpc2)}", topology)
     )
-
-
     peering_connection_id = response['VpcPeeringConnection']['VpcPeeringConnectionId']
-    # create a waiter to wait for the VPC peering connection to become available
-    waiter1 = ec2_client_1.get_waiter('vpc_peering_connection_exists')
-
-    # wait for the VPC peering connection to become pending-acceptance
-    waiter1.wait(
-        VpcPeeringConnectionIds=[peering_connection_id],
-        Filters=[
-            {
-                'Name': 'status-code',
-                'Values': ['pending-acceptance','failed']
-            }
-        ],
-        WaiterConfig={
-            'Delay': 1,
-            'MaxAttempts': 120
-        }
-    )
-
-    logger.success(f'Peering connection request made successfully from {region_name_1}:{vpc_id_1} -> {region_name_2}:{vpc_id_2}')
-
-    waiter2 = ec2_client_2.get_waiter('vpc_peering_connection_exists')
-    waiter2.wait(
-        VpcPeeringConnectionIds=[peering_connection_id],
-        Filters=[
-            {
-                'Name': 'status-code',
-                'Values': ['pending-acceptance', 'failed']
-            }
-        ],
-        WaiterConfig={
-            'Delay': 1,
-            'MaxAttempts': 120
-        }
-    )
-
-    # accept the VPC peering connection on the peer VPC
-    response = ec2_client_2.accept_vpc_peering_connection(
-        VpcPeeringConnectionId=peering_connection_id
-    )
-
-    # create a waiter to wait for the VPC peering connection to become "active" in the peer VPC
-    waiter3 = ec2_client_2.get_waiter('vpc_peering_connection_exists')
-
-    # wait for the VPC peering connection to become "active" in the peer VPC
-    waiter3.wait(
-        VpcPeeringConnectionIds=[peering_connection_id],
-        Filters=[
-            {
-                'Name': 'status-code',
-                'Values': ['active']
-            }
-        ],
-        WaiterConfig={
-            'Delay': 1,
-            'MaxAttempts': 120
-        }
-    )
-
-    # print the ID of the new VPC peering connection
-    logger.info('Created VPC peering connection with ID: ' + peering_connection_id)
-    route_table_id_1 = vpc1['RouteTableId']
-    destination_cidr_block_2 = vpc2['cidr']
-    add_route_to_peering(vpc_id_1, route_table_id_1, destination_cidr_block_2, peering_connection_id, region_name_1)
-
-    route_table_id_2 = vpc2['RouteTableId']
-    destination_cidr_block_1 = vpc1['cidr']
-    add_route_to_peering(vpc_id_1, route_table_id_2, destination_cidr_block_1, peering_connection_id, region_name_2)
-
-def add_route_to_peering(vpc_id, route_table_id, destination_cidr_block, peering_connection_id, region_name):
-    ec2 = boto3.client('ec2', region_name=region_name)
-    response = ec2.create_route(
-        DestinationCidrBlock=destination_cidr_block,
-        RouteTableId=route_table_id,
-        VpcPeeringConnectionId=peering_connection_id,
-    )
-    # Wait for the route to become active
-    max_attempts = 10
-    attempts = 0
-    while attempts < max_attempts:
-        try:
-            response = ec2.describe_route_tables(RouteTableIds=[route_table_id])
-            for route_table in response['RouteTables']:
-                for route in route_table['Routes']:
-                    if route.get('DestinationCidrBlock') == destination_cidr_block:
-                        if route.get('State') == 'active':
-                            logger.success(f"Route {destination_cidr_block} to VPC peering connection {peering_connection_id} is now active.")
-                            return
-                        else:
-                            logger.warning(f"Route {destination_cidr_block} to VPC peering connection {peering_connection_id} is still being propagated...")
-                            break
-            attempts += 1
-            time.sleep(3)
-        except Exception as e:
-            logger.warning(f"An error occurred: {e}")
-            attempts += 1
-            time.sleep(3)
-
-    logger.critical(f"Route {destination_cidr_block} to VPC peering connection {peering_connection_id} did not become active within the allotted time.")
-
-def create_peering_connections(all_vpc):
-    matrix = []
-
-    for i, vpc1 in enumerate(all_vpc):
-        for j, vpc2 in enumerate(all_vpc):
-            if i != j:
-                if len(matrix) < 1:
-                    matrix.append(list([i,j]))
-                    continue
-                exist = False
-                for mat in list(matrix):
-                    if (list([i,j]) == mat) or (list([j,i]) == mat) :
-                        exist = True
-                if exist == False:
-                    matrix.append(list([i, j]))
-                    continue
+    state.record(record, 'VpcPeeringConnectionId', peering_connection_id)
+    logger.success(f"Peering connection request made successfully from {vpc1['region_name']}:{vpc1['VpcId']} -> {vpc2['region_name']}:{vpc2['VpcId']}")
+    return peering_connection_id
+
+
+def accept_peerings(region_name, peering_connection_ids):
+    ec2 = get_ec2_client(region_name)
+    poller = get_poller(region_name)
+    # Cross-region requests show up in the accepter region asynchronously
+    poller.wait('peering', peering_connection_ids, ('pending-acceptance', 'active'))
+    # Connections accepted by an earlier run are already active
+    states = poller.describe('peering', peering_connection_ids)
+    for peering_connection_id in peering_connection_ids:
+        if states.get(peering_connection_id) == 'pending-acceptance':
+            ec2.accept_vpc_peering_connection(VpcPeeringConnectionId=peering_connection_id)
+    poller.wait('peering', peering_connection_ids, ('active',))
+    logger.info(f"Accepted {len(peering_connection_ids)} VPC peering connections in {region_name}")
+
+
+def add_peering_routes(region_name, routes):
+    # routes: (route_table_id, destination_cidr_block, peering_connection_id) for one region
+    ec2 = get_ec2_client(region_name)
+    for route_table_id, destination_cidr_block, peering_connection_id in routes:
+        ignore_errors(
+            ('RouteAlreadyExists',),
+            ec2.create_route,
+            DestinationCidrBlock=destination_cidr_block,
+            RouteTableId=route_table_id,
+            VpcPeeringConnectionId=peering_connection_id,
+        )
+    try:
+        get_poller(region_name).wait('route', [(route_table_id, cidr) for route_table_id, cidr, _ in routes],
+                                     ('active',), timeout=30)
+        logger.success(f"{len(routes)} peering routes in {region_name} are now active.")
+        return True
+    except (TimeoutError, ClientError) as e:
+        logger.critical(f"Peering routes in {region_name} did not become active within the allotted time: {e}")
+        return False
+
+
+def create_peering_connections(all_vpc, max_workers=16, state=None, reconcile=False, topology=None):
+    state = state or TopologyState()
+    # Full mesh: every unordered pair of VPCs, n * (n - 1) / 2 links
+    matrix = [list(pair) for pair in combinations(range(len(all_vpc)), 2)]
 
     logger.info(len(matrix))
     logger.info(json.dumps(matrix))
 
-    for mat in list(matrix):
-        create_peering(all_vpc[mat[0]],all_vpc[mat[1]])
-
-
-def run():
-    all_vpc = []
-    for c, region_name in enumerate(common_regions):
-        vpc_row = create_vpc(region_name, c)
-        all_vpc.append( vpc_row)
+    # Links whose routes were verified by an earlier run are left alone
+    records = [state.peering(peering_key(all_vpc[mat[0]], all_vpc[mat[1]])) for mat in matrix]
+    todo = [mat for mat, record in zip(matrix, records) if not record.get('Routed')]
+    if len(todo) < len(matrix):
+        logger.info(f"{len(matrix) - len(todo)} peering connections are already in place")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Send every peering request at once
+        peering_connection_ids = list(executor.map(
+            lambda mat: request_peering(all_vpc[mat[0]], all_vpc[mat[1]], state, reconcile, topology), todo))
+
+        # Accept them in the peer regions, all connections of a region handled together
+        by_accepter = defaultdict(list)
+        for mat, peering_connection_id in zip(todo, peering_connection_ids):
+            by_accepter[all_vpc[mat[1]]['region_name']].append(peering_connection_id)
+        list(executor.map(accept_peerings, by_accepter, by_accepter.values()))
+
+        # Add the routes on both sides and poll each region's route tables in bulk
+        routes = defaultdict(list)
+        for mat, peering_connection_id in zip(todo, peering_connection_ids):
+            vpc1, vpc2 = all_vpc[mat[0]], all_vpc[mat[1]]
+            routes[vpc1['region_name']].append((vpc1['RouteTableId'], vpc2['cidr'], peering_connection_id))
+            routes[vpc2['region_name']].append((vpc2['RouteTableId'], vpc1['cidr'], peering_connection_id))
+        routed = dict(zip(routes, executor.map(add_peering_routes, routes, routes.values())))
+
+    for mat, peering_connection_id in zip(todo, peering_connection_ids):
+        vpc1, vpc2 = all_vpc[mat[0]], all_vpc[mat[1]]
+        if routed[vpc1['region_name']] and routed[vpc2['region_name']]:
+            state.record(state.peering(peering_key(vpc1, vpc2)), 'Routed', True)
+        logger.info(f"Created VPC peering connection with ID: {peering_connection_id} ({vpc1['region_name']} <-> {vpc2['region_name']})")
+    return [record['VpcPeeringConnectionId'] for record in records]
+
+
+def create_transit_gateway(region_name, state=None, topology=None):
+    state = state or TopologyState()
+    topology = topology or topology_name
+    vpcs = state.vpc(region_name)
+    ec2 = get_ec2_client(region_name)
+    transit_gateway_id = vpcs.get('TransitGatewayId')
+    if not transit_gateway_id:
+        response = ec2.create_transit_gateway(
+            Description=f"{topology} {region_name}",
+            TagSpecifications=tag_specifications('transit-gateway', f"{topology}-{region_name}", topology)
+        )
+        transit_gateway_id = response['TransitGateway']['TransitGatewayId']
+        state.record(vpcs, 'TransitGatewayId', transit_gateway_id)
+        logger.info("Created Transit Gateway with ID: {}", transit_gateway_id)
+
+    # Transit gateways take minutes to become available; this runs alongside the VPC build
+    get_poller(region_name).wait('transit-gateway', [transit_gateway_id], ('available',), timeout=1200)
+    if not vpcs.get('TransitGatewayRouteTableId'):
+        gateway = ec2.describe_transit_gateways(TransitGatewayIds=[transit_gateway_id])['TransitGateways'][0]
+        state.record(vpcs, 'TransitGatewayRouteTableId', gateway['Options']['AssociationDefaultRouteTableId'])
+    return transit_gateway_id
+
+
+def attach_vpc_to_transit_gateway(vpcs, supernets, state, topology):
+    region_name = vpcs['region_name']
+    ec2 = get_ec2_client(region_name)
+    attachment_id = vpcs.get('TransitGatewayAttachmentId')
+    if not attachment_id:
+        # An attachment takes at most one subnet per availability zone
+        subnets = ec2.describe_subnets(SubnetIds=vpcs['Subnets'])['Subnets']
+        subnet_ids = list({subnet['AvailabilityZone']: subnet['SubnetId'] for subnet in reversed(subnets)}.values())
+        response = ec2.create_transit_gateway_vpc_attachment(
+            TransitGatewayId=vpcs['TransitGatewayId'],
+            VpcId=vpcs['VpcId'],
+            SubnetIds=subnet_ids,
+            TagSpecifications=tag_specifications('transit-gateway-attachment', f"{topology}-{region_name}", topology)
+        )
+        attachment_id = response['TransitGatewayVpcAttachment']['TransitGatewayAttachmentId']
+        state.record(vpcs, 'TransitGatewayAttachmentId', attachment_id)
+    get_poller(region_name).wait('transit-gateway-attachment', [attachment_id], ('available',), timeout=1200)
+
+    # One route per supernet reaches every other region, however many there are
+    for supernet in supernets:
+        ignore_errors(
+            ('RouteAlreadyExists',),
+            ec2.create_route,
+            DestinationCidrBlock=supernet,
+            RouteTableId=vpcs['RouteTableId'],
+            TransitGatewayId=vpcs['TransitGatewayId'],
+        )
+    logger.info(f"Attached VPC {vpcs['VpcId']} to Transit Gateway {vpcs['TransitGatewayId']} in {region_name}")
+    return attachment_id
+
+
+def discover_transit_peering(spoke, hub, topology):
+    ec2 = get_ec2_client(spoke['region_name'])
+    response = ec2.describe_transit_gateway_peering_attachments(Filters=[
+        {'Name': 'tag:' + TOPOLOGY_TAG, 'Values': [topology]},
+        {'Name': 'transit-gateway-id', 'Values': [spoke['TransitGatewayId']]},
+    ])
+    for attachment in response['TransitGatewayPeeringAttachments']:
+        if attachment['AccepterTgwInfo'].get('TransitGatewayId') != hub['TransitGatewayId']:
+            continue
+        if attachment['State'] in FAILED_ATTACHMENT_STATES:
+            continue
+        logger.info(f"Found existing Transit Gateway peering attachment {attachment['TransitGatewayAttachmentId']} by tag")
+        return attachment['TransitGatewayAttachmentId']
+
+
+def request_transit_peering(spoke, hub, account_id, state, reconcile=False, topology=None):
+    topology = topology or topology_name
+    record = state.transit(peering_key(spoke, hub))
+    attachment_id = record.get('TransitGatewayAttachmentId')
+    if not attachment_id and reconcile:
+        attachment_id = discover_transit_peering(spoke, hub, topology)
+    if attachment_id:
+        state.record(record, 'TransitGatewayAttachmentId', attachment_id)
+        return attachment_id
+    ec2 = get_ec2_client(spoke['region_name'])
+    response = ec2.create_transit_gateway_peering_attachment(
+        TransitGatewayId=spoke['TransitGatewayId'],
+        PeerTransitGatewayId=hub['TransitGatewayId'],
+        PeerAccountId=account_id,
+        PeerRegion=hub['region_name'],
+        TagSpecifications=tag_specifications('transit-gateway-attachment', f"{topology}-{peering_key(spoke, hub)}", topology)
+    )
+    attachment_id = response['TransitGatewayPeeringAttachment']['TransitGatewayAttachmentId']
+    state.record(record, 'TransitGatewayAttachmentId', attachment_id)
+    logger.success(f"Transit Gateway peering request made successfully from {spoke['region_name']}:{spoke['TransitGatewayId']} -> {hub['region_name']}:{hub['TransitGatewayId']}")
+    return attachment_id
+
+
+def accept_transit_peerings(region_name, attachment_ids):
+    ec2 = get_ec2_client(region_name)
+    poller = get_poller(region_name)
+    poller.wait('transit-gateway-attachment', attachment_ids, ('pendingAcceptance', 'pending', 'available'), timeout=1200)
+    states = poller.describe('transit-gateway-attachment', attachment_ids)
+    for attachment_id in attachment_ids:
+        if states.get(attachment_id) == 'pendingAcceptance':
+            ec2.accept_transit_gateway_peering_attachment(TransitGatewayAttachmentId=attachment_id)
+    poller.wait('transit-gateway-attachment', attachment_ids, ('available',), timeout=1200)
+    logger.info(f"Accepted {len(attachment_ids)} Transit Gateway peering attachments in {region_name}")
+
+
+def add_transit_routes(region_name, routes):
+    # routes: (transit_gateway_route_table_id, destination_cidr_block, attachment_id) for one region
+    ec2 = get_ec2_client(region_name)
+    for route_table_id, destination_cidr_block, attachment_id in routes:
+        ignore_errors(
+            ('RouteAlreadyExists',),
+            ec2.create_transit_gateway_route,
+            DestinationCidrBlock=destination_cidr_block,
+            TransitGatewayRouteTableId=route_table_id,
+            TransitGatewayAttachmentId=attachment_id,
+        )
+    try:
+        get_poller(region_name).wait('transit-gateway-route', [(route_table_id, cidr) for route_table_id, cidr, _ in routes],
+                                     ('active',), timeout=60)
+        logger.success(f"{len(routes)} Transit Gateway routes in {region_name} are now active.")
+        return True
+    except (TimeoutError, ClientError) as e:
+        logger.critical(f"Transit Gateway routes in {region_name} did not become active within the allotted time: {e}")
+        return False
+
+
+def create_transit_hub(all_vpc, hub_name, supernets, max_workers=16, state=None, reconcile=False, topology=None):
+    # Hub and spoke: every region's transit gateway peers only with the hub's, so adding a region
+    # adds one link and a fixed number of routes instead of a peering to every other region.
+    state = state or TopologyState()
+    topology = topology or topology_name
+    hub = next((vpcs for vpcs in all_vpc if vpcs['region_name'] == hub_name), None)
+    if hub is None:
+        raise ValueError(f"Hub region {hub_name} has no VPC in this topology")
+    spokes = [vpcs for vpcs in all_vpc if vpcs is not hub]
+    records = [state.transit(peering_key(spoke, hub)) for spoke in spokes]
+    todo = [spoke for spoke, record in zip(spokes, records) if not record.get('Routed')]
+    account_id = boto3.client('sts').get_caller_identity()['Account']
+
+    logger.info(f"{len(spokes)} spokes around hub {hub_name}")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(partial(attach_vpc_to_transit_gateway, supernets=supernets, state=state, topology=topology),
+                          all_vpc))
+
+        # Send every peering request at once and accept them all in the hub region
+        attachment_ids = list(executor.map(
+            lambda spoke: request_transit_peering(spoke, hub, account_id, state, reconcile, topology), todo))
+        if attachment_ids:
+            accept_transit_peerings(hub_name, attachment_ids)
+        list(executor.map(
+            lambda spoke, attachment_id: get_poller(spoke['region_name']).wait(
+                'transit-gateway-attachment', [attachment_id], ('available',), timeout=1200),
+            todo, attachment_ids))
+
+        # Spokes send the supernets to the hub; the hub sends each spoke's CIDR to that spoke
+        routes = defaultdict(list)
+        for spoke, attachment_id in zip(todo, attachment_ids):
+            for supernet in supernets:
+                routes[spoke['region_name']].append((spoke['TransitGatewayRouteTableId'], supernet, attachment_id))
+            routes[hub_name].append((hub['TransitGatewayRouteTableId'], spoke['cidr'], attachment_id))
+        routed = dict(zip(routes, executor.map(add_transit_routes, routes, routes.values())))
+
+    for spoke, attachment_id in zip(todo, attachment_ids):
+        if routed[spoke['region_name']] and routed[hub_name]:
+            state.record(state.transit(peering_key(spoke, hub)), 'Routed', True)
+        logger.info(f"Created Transit Gateway peering attachment with ID: {attachment_id} ({spoke['region_name']} <-> {hub_name})")
+    return [record['TransitGatewayAttachmentId'] for record in records]
+
+
+def run(spec=None, state_path='peering_state.json', reconcile=False, dry_run=False, profile_path=None, max_workers=32):
+    with profiling(profile_path):
+        return provision(spec, state_path, reconcile, dry_run, max_workers)
+
+
+def provision(spec=None, state_path='peering_state.json', reconcile=False, dry_run=False, max_workers=32):
+    # max_workers caps every thread pool; max_workers=1 provisions everything one call at a time
+    spec = spec or default_topology
+    topology = spec['name']
+    state = TopologyState(state_path)
+
+    with span('phase', 'plan'):
+        desired = plan_topology(spec, state)
+
+        if reconcile:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(desired))) as executor:
+                list(executor.map(partial(reconcile_vpc, state=state, topology=topology), desired))
+
+        steps = diff_topology(desired, state, spec)
+    for region_name, operation, detail in steps:
+        logger.info(f"Plan: {region_name} {operation} {detail}")
+    logger.info(f"Plan has {len(steps)} steps for {len(desired)} VPCs")
+    if dry_run or not steps:
+        return steps
+
+    def build_vpc(desired_vpc):
+        with span('phase', 'create_vpc', desired_vpc['region_name']):
+            return create_vpc(desired_vpc['region_name'], desired_vpc, state=state, topology=topology,
+                              max_workers=min(max_workers, 8))
+
+    def build_transit_gateway(region_name):
+        with span('phase', 'create_transit_gateway', region_name):
+            return create_transit_gateway(region_name, state, topology)
+
+    # One worker per region; results keep the order of the topology spec
+    with span('phase', 'regions'), ThreadPoolExecutor(max_workers=min(max_workers, 2 * len(desired))) as executor:
+        gateways = []
+        if spec['mode'] == 'hub':
+            gateways = [executor.submit(build_transit_gateway, desired_vpc['region_name']) for desired_vpc in desired]
+        all_vpc = list(executor.map(build_vpc, desired))
+        for gateway in gateways:
+            gateway.result()
 
     # logger.info(json.dumps(all_vpc, indent=2, sort_keys=True, default=str))
     with open('all_vpc.json', 'w') as f:
         json.dump(all_vpc, f)
 
-    with open('all_vpc.json') as f:
-        json_data = f.read()
-
-    # Convert the JSON data to a Python object
-    all_vpc = json.loads(json_data)
     # logger.success("VPCs created successfully")
-    create_peering_connections(all_vpc)
+    with span('phase', 'links'):
+        if spec['mode'] == 'hub':
+            create_transit_hub(all_vpc, hub_region(spec), spec['supernets'], max_workers=min(max_workers, 16),
+                               state=state, reconcile=reconcile, topology=topology)
+        else:
+            create_peering_connections(all_vpc, max_workers=min(max_workers, 16), state=state, reconcile=reconcile,
+                                       topology=topology)
+    return steps
+
+
+# Deleting an already deleted resource is not an error during teardown
+MISSING_CODES = (
+    'InvalidVpcID.NotFound', 'InvalidSubnetID.NotFound', 'InvalidRouteTableID.NotFound',
+    'InvalidInternetGatewayID.NotFound', 'Gateway.NotAttached', 'InvalidVpcPeeringConnectionID.NotFound',
+    'InvalidTransitGatewayID.NotFound', 'InvalidTransitGatewayAttachmentID.NotFound',
+    'InvalidAssociationID.NotFound',
+)
 
 
-run()
\ No newline at end of file
+def retry_dependency(fn, max_attempts=8, **kwargs):
+    # Network interfaces of deleted attachments linger for a while and block subnet/VPC deletion
+    for attempt in range(max_attempts):
+        try:
+            return ignore_errors(MISSING_CODES, fn, **kwargs)
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'DependencyViolation' or attempt == max_attempts - 1:
+                raise
+            time.sleep(min(2 ** attempt, 30))
+
+
+def delete_links(section, state, operation, id_name, resource_type, max_workers=16):
+    # Links are deleted from the region that requested them (the first region of the key),
+    # then each region's deletions are confirmed with one poll.
+    links = defaultdict(list)
+    for key, record in list(state.data.get(section, {}).items()):
+        link_id = record.get(id_name)
+        if link_id:
+            links[key.split('|')[0]].append((key, link_id))
+        else:
+            state.forget(section, key)
+
+    def delete_region_links(region_name, region_links):
+        ec2 = get_ec2_client(region_name)
+        for key, link_id in region_links:
+            ignore_errors(MISSING_CODES, getattr(ec2, operation), **{id_name: link_id})
+        get_poller(region_name).wait(resource_type, [link_id for _, link_id in region_links], ('deleted', None),
+                                     timeout=1200, failed_states=())
+        for key, link_id in region_links:
+            state.forget(section, key)
+        logger.info(f"Deleted {len(region_links)} links in {region_name}")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(delete_region_links, links, links.values()))
+
+
+def delete_vpc(vpcs, state, max_workers=8):
+    region_name = vpcs['region_name']
+    ec2 = get_ec2_client(region_name)
+    poller = get_poller(region_name)
+
+    # The transit gateway attachment owns network interfaces in the subnets, so it goes first
+    if vpcs.get('TransitGatewayAttachmentId'):
+        ignore_errors(MISSING_CODES, ec2.delete_transit_gateway_vpc_attachment,
+                      TransitGatewayAttachmentId=vpcs['TransitGatewayAttachmentId'])
+        poller.wait('transit-gateway-attachment', [vpcs['TransitGatewayAttachmentId']], ('deleted', None),
+                    timeout=1200, failed_states=())
+        state.record(vpcs, 'TransitGatewayAttachmentId', None)
+    transit_gateway_id = vpcs.get('TransitGatewayId')
+    if transit_gateway_id:
+        ignore_errors(MISSING_CODES, ec2.delete_transit_gateway, TransitGatewayId=transit_gateway_id)
+
+    state.record(vpcs, 'Ready', False)
+    associations = []
+    if vpcs.get('RouteTableId'):
+        try:
+            route_tables = ec2.describe_route_tables(RouteTableIds=[vpcs['RouteTableId']])['RouteTables']
+        except ClientError as e:
+            if e.response['Error']['Code'] not in MISSING_CODES:
+                raise
+            route_tables = []
+        associations = [association['RouteTableAssociationId'] for route_table in route_tables
+                        for association in route_table['Associations'] if not association.get('Main')]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # First detach everything from the VPC...
+        futures = [executor.submit(ignore_errors, MISSING_CODES, ec2.disassociate_route_table, AssociationId=association_id)
+                   for association_id in associations]
+        if vpcs.get('InternetGatewayId') and vpcs.get('VpcId'):
+            futures.append(executor.submit(ignore_errors, MISSING_CODES, ec2.detach_internet_gateway,
+                                           InternetGatewayId=vpcs['InternetGatewayId'], VpcId=vpcs['VpcId']))
+        for future in futures:
+            future.result()
+
+        # ...then delete the detached resources together
+        futures = [executor.submit(retry_dependency, ec2.delete_subnet, SubnetId=subnet_id)
+                   for subnet_id in vpcs.get('Subnets') or [] if subnet_id]
+        if vpcs.get('InternetGatewayId'):
+            futures.append(executor.submit(ignore_errors, MISSING_CODES, ec2.delete_internet_gateway,
+                                           InternetGatewayId=vpcs['InternetGatewayId']))
+        if vpcs.get('RouteTableId'):
+            futures.append(executor.submit(retry_dependency, ec2.delete_route_table, RouteTableId=vpcs['RouteTableId']))
+        for future in futures:
+            future.result()
+    state.merge(vpcs, {'Subnets': [], 'InternetGatewayId': None, 'RouteTableId': None})
+
+    if vpcs.get('VpcId'):
+        retry_dependency(ec2.delete_vpc, VpcId=vpcs['VpcId'])
+        logger.info("Deleted VPC with ID: {}", vpcs['VpcId'])
+        state.record(vpcs, 'VpcId', None)
+
+    if transit_gateway_id:
+        poller.wait('transit-gateway', [transit_gateway_id], ('deleted', None), timeout=1200, failed_states=())
+        logger.info("Deleted Transit Gateway with ID: {}", transit_gateway_id)
+    state.forget('vpcs', region_name)
+
+
+def teardown(spec=None, state_path='peering_state.json', reconcile=False, max_workers=32, profile_path=None):
+    with profiling(profile_path):
+        destroy(spec, state_path, reconcile, max_workers)
+
+
+def destroy(spec=None, state_path='peering_state.json', reconcile=False, max_workers=32):
+    # Deletes everything recorded in the state file (and, with reconcile, everything found by tag):
+    # links first, then every region's VPC in parallel.
+    spec = spec or default_topology
+    topology = spec['name']
+    state = TopologyState(state_path)
+    desired = plan_topology(spec, state)
+
+    if reconcile:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(desired))) as executor:
+            list(executor.map(partial(reconcile_vpc, state=state, topology=topology), desired))
+        found = [state.vpc(desired_vpc['region_name']) for desired_vpc in desired]
+        for vpc1, vpc2 in combinations([vpcs for vpcs in found if vpcs.get('VpcId')], 2):
+            record = state.peering(peering_key(vpc1, vpc2))
+            if not record.get('VpcPeeringConnectionId'):
+                state.merge(record, {'VpcPeeringConnectionId': discover_peering(vpc1, vpc2, topology)})
+        gateways = [vpcs for vpcs in found if vpcs.get('TransitGatewayId')]
+        hub = next((vpcs for vpcs in gateways if vpcs['region_name'] == hub_region(spec)), None)
+        for spoke in gateways:
+            record = state.transit(peering_key(spoke, hub)) if hub and spoke is not hub else {}
+            if hub and spoke is not hub and not record.get('TransitGatewayAttachmentId'):
+                state.merge(record, {'TransitGatewayAttachmentId': discover_transit_peering(spoke, hub, topology)})
+
+    started = time.monotonic()
+    with span('phase', 'links'):
+        delete_links('peerings', state, 'delete_vpc_peering_connection', 'VpcPeeringConnectionId', 'peering',
+                     min(max_workers, 16))
+        delete_links('transit', state, 'delete_transit_gateway_peering_attachment', 'TransitGatewayAttachmentId',
+                     'transit-gateway-attachment', min(max_workers, 16))
+
+    def remove_vpc(vpcs):
+        with span('phase', 'delete_vpc', vpcs['region_name']):
+            delete_vpc(vpcs, state, max_workers=min(max_workers, 8))
+
+    all_vpc = list(state.data['vpcs'].values())
+    if all_vpc:
+        with span('phase', 'regions'), ThreadPoolExecutor(max_workers=min(max_workers, len(all_vpc))) as executor:
+            list(executor.map(remove_vpc, all_vpc))
+    logger.success(f"Deleted {len(all_vpc)} VPCs and their links in {time.monotonic() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Provision or tear down a multi-region VPC mesh or transit hub.')
+    parser.add_argument('--topology', help='JSON topology spec. Defaults to a full mesh of common_regions')
+    parser.add_argument('--mode', choices=['mesh', 'hub'], help='Override the mode of the topology spec')
+    parser.add_argument('--state', default='peering_state.json', help='State file recording created resources')
+    parser.add_argument('--reconcile', action='store_true', help='Find resources missing from the state file by tag')
+    parser.add_argument('--dry-run', action='store_true', help='Only print the planned API calls')
+    parser.add_argument('--teardown', action='store_true', help='Delete the topology instead of creating it')
+    parser.add_argument('--profile', dest='profile_path', help='Write a JSON timeline (and a .txt Gantt chart) here')
+    parser.add_argument('--max-workers', type=int, default=32, help='Upper bound for every thread pool')
+    args = parser.parse_args()
+
+    configure_logging()
+    spec = load_topology(args.topology) if args.topology else dict(default_topology)
+    if args.mode:
+        spec['mode'] = args.mode
+    if args.teardown:
+        teardown(spec, args.state, args.reconcile, args.max_workers, args.profile_path)
+    else:
+        run(spec, args.state, args.reconcile, args.dry_run, args.profile_path, args.max_workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,18 @@
 import asyncio
 import boto3
+from botocore.config import Config
 import os
 import time
 from binance import AsyncClient, BinanceSocketManager
 
+s3_client = boto3.client('s3', config=Config(max_pool_connections=10, tcp_keepalive=True))
+
 # Function to upload file to S3
 async def upload_file_to_s3(file_path, bucket_name):
-    s3 = boto3.client('s3')
     file_key = os.path.basename(file_path)
-    s3.upload_file(file_path, bucket_name, file_key)
+    # upload_file blocks, so it runs on a worker thread and the event loop stays free meanwhile.
+    # main() awaits it and stops after the first upload, so no trades are read during it.
+    await asyncio.to_thread(s3_client.upload_file, file_path, bucket_name, file_key)
     print(f"File uploaded to S3: {file_key}")
     return file_key  # Return the S3 file key after upload
 
@@ -1,12 +1,14 @@
 import asyncio
 import boto3
+from botocore.config import Config
 from datetime import datetime
 
+s3_client = boto3.client('s3', config=Config(max_pool_connections=10, tcp_keepalive=True))
+
 # Helper function to download file from S3
 async def download_file_from_s3(bucket_name, file_key):
-    s3 = boto3.client('s3')
     download_path = f'/tmp/{file_key}'
-    s3.download_file(bucket_name, file_key, download_path)
+    await asyncio.to_thread(s3_client.download_file, bucket_name, file_key, download_path)
     return download_path
 
 # Function to convert Unix time to human-readable date-time
@@ -15,8 +17,7 @@ def unix_time_to_datetime(unix_timestamp):
 
 # Function to upload the processed file back to S3 with a new file name
 async def upload_file_to_s3(bucket_name, file_path, new_file_key):
-    s3 = boto3.client('s3')
-    s3.upload_file(file_path, bucket_name, new_file_key)
+    await asyncio.to_thread(s3_client.upload_file, file_path, bucket_name, new_file_key)
     return f"{new_file_key}"
 
 # Main processing function for Step 2
@@ -1,13 +1,15 @@
 import asyncio
 import boto3
+from botocore.config import Config
 from datetime import datetime
 
+s3_client = boto3.client('s3', config=Config(max_pool_connections=10, tcp_keepalive=True))
+
 # Helper function to download file from S3
 async def download_file_from_s3(bucket_name, file_key):
-    s3 = boto3.client('s3')
     download_path = f'/tmp/{file_key}'
     try:
-        s3.download_file(bucket_name, file_key, download_path)
+        await asyncio.to_thread(s3_client.download_file, bucket_name, file_key, download_path)
         print(f"Downloaded file {file_key} to {download_path}")
     except Exception as e:
         print(f"Error downloading file: {e}")
@@ -16,10 +18,9 @@ async def download_file_from_s3(bucket_name, file_key):
 
 # Function to upload the modified file back to S3 with a new file name
 async def upload_file_to_s3(bucket_name, file_path, new_file_key):
-    s3 = boto3.client('s3')
     new_filename = new_file_key.replace("_step_2", "")
     try:
-        s3.upload_file(file_path, bucket_name, new_filename)
+        await asyncio.to_thread(s3_client.upload_file, file_path, bucket_name, new_filename)
         print(f"Successfully uploaded {new_filename} to S3")
     except Exception as e:
         print(f"Error uploading file: {e}")
@@ -1,10 +1,14 @@
 import json
+import logging
 import requests
 import re
 from datetime import datetime
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
+s3_client = boto3.client('s3', config=Config(max_pool_connections=10, tcp_keepalive=True))
+
 
 def extract_data(raw_data,symbol):
     regex = re.compile(r'\[\s*(-?\d+(?:\.\d+)?),\s*(-?\d+(?:\.\d+)?),\s*(-?\d+(?:\.\d+)?),\s*(-?\d+(?:\.\d+)?),\s*(-?\d+(?:\.\d+)?)\s*\]')
@@ -39,7 +43,6 @@ def upload_to_s3(file_name, bucket, object_name=None):
         object_name = file_name
 
     # Upload the file
-    s3_client = boto3.client('s3')
     try:
         response = s3_client.upload_file(file_name, bucket, object_name)
     except ClientError as e: